@@ -1,13 +1,23 @@
 import asyncio
+import json
+from typing import List, Optional
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
 from app.models.analytics import (
     OverviewRequest, 
     CompareRequest, 
     OverviewResponse, 
-    CompareResponse
+    CompareResponse,
+    ChatMessage,
+    TranscriptMessagesRequest
 )
 from app.services.voiceflow_client import voiceflow_client
-from app.services.cache import cache_service
+from app.services.cache import cache_service, MISSING
+from app.services.overview import overview_service
+from app.services.timeseries import auto_granularity, shape_chart
+from app.services.transcript_messages import message_fields, project_messages, transcript_messages
+from app.services.warehouse import warehouse
 from datetime import datetime, timedelta
 
 def normalize_date_format(date_str: str) -> str:
@@ -48,14 +58,15 @@ async def get_overview(request: OverviewRequest):
     cache_key = f"overview:{request.project_id}:{start_date}:{end_date}"
     
     async def fetch_data():
-        return await voiceflow_client.get_analytics_overview(
+        return await overview_service.get_overview(
             request.project_id, 
             start_date, 
             end_date
         )
     
     try:
-        data = await cache_service.get_cached_or_fetch(cache_key, fetch_data)
+        data = await cache_service.get_cached_or_fetch(cache_key, fetch_data, range_end=end_date)
+        data = shape_chart(data, start_date, end_date, request.granularity, request.max_points)
         return OverviewResponse(**data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch overview data: {str(e)}")
@@ -84,25 +95,25 @@ async def get_comparison(request: CompareRequest):
     previous_cache_key = f"overview:{request.project_id}:{prev_start_str}:{prev_end_str}"
     
     async def fetch_current():
-        return await voiceflow_client.get_analytics_overview(
+        return await overview_service.get_overview(
             request.project_id, 
             start_date_str, 
             end_date_str
         )
     
     async def fetch_previous():
-        return await voiceflow_client.get_analytics_overview(
+        return await overview_service.get_overview(
             request.project_id, 
             prev_start_str, 
             prev_end_str
         )
     
     try:
-        # Fetch both periods in parallel
-        current_data, previous_data = await asyncio.gather(
-            cache_service.get_cached_or_fetch(current_cache_key, fetch_current),
-            cache_service.get_cached_or_fetch(previous_cache_key, fetch_previous)
-        )
+        # Read both periods in one cache round-trip, fetching misses in parallel
+        current_data, previous_data = await cache_service.get_cached_or_fetch_many([
+            (current_cache_key, fetch_current, end_date_str),
+            (previous_cache_key, fetch_previous, prev_end_str)
+        ])
         
         # Calculate percentage changes
         changes = {}
@@ -116,6 +127,13 @@ async def get_comparison(request: CompareRequest):
                     else:
                         changes[key] = 0
         
+        # Same bucket size for both periods so their charts line up
+        granularity = request.granularity
+        if granularity == "auto":
+            granularity = auto_granularity(start_date_str, end_date_str)
+        current_data = shape_chart(current_data, start_date_str, end_date_str, granularity, request.max_points)
+        previous_data = shape_chart(previous_data, prev_start_str, prev_end_str, granularity, request.max_points)
+        
         return CompareResponse(
             current=OverviewResponse(**current_data),
             previous=OverviewResponse(**previous_data),
@@ -141,10 +159,12 @@ async def get_transcripts(
     cache_key = f"transcripts:{project_id}:{start_date}:{end_date}:{limit}:{skip}:{order}"
     
     async def fetch_data():
+        if warehouse.covers(project_id, start_date, end_date):
+            return await warehouse.get_transcripts(project_id, start_date, end_date, limit, skip, order)
         return await voiceflow_client.get_transcript_analytics(project_id, start_date, end_date, limit, skip, order)
     
     try:
-        data = await cache_service.get_cached_or_fetch(cache_key, fetch_data)
+        data = await cache_service.get_cached_or_fetch(cache_key, fetch_data, range_end=end_date)
         return data
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch transcripts: {str(e)}")
@@ -159,24 +179,79 @@ async def get_top_intents(project_id: str, start: str, end: str):
     cache_key = f"intents:{project_id}:{start_date}:{end_date}"
     
     async def fetch_data():
+        if warehouse.covers(project_id, start_date, end_date):
+            return await warehouse.get_top_intents(project_id, start_date, end_date)
         return await voiceflow_client.get_top_intents(project_id, start_date, end_date)
     
     try:
-        data = await cache_service.get_cached_or_fetch(cache_key, fetch_data)
+        data = await cache_service.get_cached_or_fetch(cache_key, fetch_data, range_end=end_date)
         return data
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch intents: {str(e)}")
 
-@router.get("/transcripts/{transcript_id}/messages")
-async def get_transcript_messages(transcript_id: str):
-    """Get chat messages from a specific transcript"""
-    cache_key = f"transcript_messages:{transcript_id}"
+@router.get(
+    "/transcripts/{transcript_id}/messages",
+    response_model=List[ChatMessage],
+    response_model_exclude_unset=True
+)
+async def get_transcript_messages(transcript_id: str, include_raw: bool = False, fields: Optional[str] = None):
+    """Get chat messages from a specific transcript.
     
-    async def fetch_data():
-        return await voiceflow_client.get_chat_messages(transcript_id)
+    Messages are slim (type/role/text/timestamp) unless include_raw is set or
+    `fields` (comma-separated) asks for raw_data.
+    """
+    try:
+        include_raw, selected = message_fields(include_raw, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     try:
-        data = await cache_service.get_cached_or_fetch(cache_key, fetch_data)
-        return data
+        data = await transcript_messages.get(transcript_id, include_raw)
+        return project_messages(data, selected)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch transcript messages: {str(e)}")
+
+@router.post("/transcripts/messages")
+async def get_transcript_messages_batch(request: TranscriptMessagesRequest):
+    """Get chat messages for many transcripts in one request, streamed as NDJSON.
+    
+    Each line is {"transcript_id", "messages"} (or "error"). Cached transcripts
+    are written first; the rest are fetched with bounded concurrency and
+    written as each one completes.
+    """
+    try:
+        include_raw, selected = message_fields(request.include_raw, request.fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    transcript_ids = list(dict.fromkeys(request.transcript_ids))
+    semaphore = asyncio.Semaphore(settings.transcript_messages_batch_concurrency)
+    
+    async def fetch(transcript_id: str):
+        async with semaphore:
+            try:
+                messages = await transcript_messages.get(transcript_id, include_raw)
+                return {"transcript_id": transcript_id, "messages": project_messages(messages, selected)}
+            except Exception as e:
+                return {"transcript_id": transcript_id, "error": f"Failed to fetch transcript messages: {str(e)}"}
+    
+    async def stream():
+        missing = []
+        cached_messages = await transcript_messages.get_cached_many(transcript_ids, include_raw)
+        for transcript_id in transcript_ids:
+            cached = cached_messages[transcript_id]
+            if cached is MISSING:
+                missing.append(transcript_id)
+            else:
+                yield json.dumps({"transcript_id": transcript_id, "messages": project_messages(cached, selected)}) + "\n"
+        
+        tasks = [asyncio.ensure_future(fetch(transcript_id)) for transcript_id in missing]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            # Client went away: don't keep fetching for nobody
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -1,13 +1,20 @@
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
-from app.models.analytics import ExportRequest
-from app.services.voiceflow_client import voiceflow_client
+from fastapi.responses import FileResponse, StreamingResponse
+from app.models.analytics import ExportJobResponse, ExportRequest
+from app.services.export_jobs import export_jobs
+from app.services.overview import overview_service
+from app.services.pdf_report import pdf_renderer
+from app.services.transcript_export import (
+    encode_table,
+    iter_transcript_chunks,
+    iter_transcript_records,
+    metrics_table,
+    stream_columnar,
+    stream_csv,
+    stream_ndjson
+)
 import pandas as pd
 import io
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 
 def normalize_date_format(date_str: str) -> str:
     """Convert date string to ISO-8601 format with time if needed"""
@@ -37,16 +44,25 @@ def normalize_date_format(date_str: str) -> str:
 
 router = APIRouter()
 
+# Format -> (media type, file extension) for the typed columnar exports
+COLUMNAR_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
 @router.post("/")
 async def export_report(request: ExportRequest):
-    """Export analytics report in CSV or PDF format"""
+    """Export analytics report in CSV, PDF, Parquet or Arrow format"""
     try:
         # Normalize date formats to ISO-8601 with time
         start_date = normalize_date_format(request.start)
         end_date = normalize_date_format(request.end)
         
-        # Get data from Voiceflow API
-        data = await voiceflow_client.get_analytics_overview(
+        if request.dataset == "transcripts":
+            return export_transcripts(request, start_date, end_date)
+        
+        # Same aggregation path as /overview and /compare
+        data = await overview_service.get_overview(
             request.project_id, 
             start_date, 
             end_date
@@ -56,12 +72,78 @@ async def export_report(request: ExportRequest):
             return await export_csv(data)
         elif request.format.lower() == "pdf":
             return await export_pdf(data, request)
+        elif request.format.lower() in COLUMNAR_FORMATS:
+            return export_columnar_metrics(data, request.format.lower(), start_date, end_date)
         else:
-            raise HTTPException(status_code=400, detail="Format must be 'csv' or 'pdf'")
+            raise HTTPException(status_code=400, detail="Format must be 'csv', 'pdf', 'parquet' or 'arrow'")
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
 
+@router.post("/jobs", response_model=ExportJobResponse, status_code=202)
+async def submit_export_job(request: ExportRequest):
+    """Queue an export in the background; identical in-flight requests share one job"""
+    if not export_jobs.enabled:
+        raise HTTPException(status_code=503, detail="Background exports are unavailable")
+    try:
+        job = await export_jobs.submit(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue export: {str(e)}")
+    return job_response(job)
+
+@router.get("/jobs/{job_id}", response_model=ExportJobResponse)
+async def get_export_job(job_id: str):
+    """Poll an export job's status and progress"""
+    job = await export_jobs.get(job_id) if export_jobs.enabled else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job_response(job)
+
+@router.get("/jobs/{job_id}/download")
+async def download_export_job(job_id: str):
+    """Download a finished export from local storage"""
+    job = await export_jobs.get(job_id) if export_jobs.enabled else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    if job["status"] == "expired":
+        raise HTTPException(status_code=410, detail="Export has expired")
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Export is {job['status']}")
+    return FileResponse(job["path"], media_type=job["media_type"], filename=job["filename"])
+
+def job_response(job: dict) -> ExportJobResponse:
+    download_url = f"/api/export/jobs/{job['id']}/download" if job["status"] == "succeeded" else None
+    return ExportJobResponse(**{**job, "download_url": download_url})
+
+def export_transcripts(request: ExportRequest, start_date: str, end_date: str):
+    """Stream every transcript in the range as chunked CSV, NDJSON, Parquet or Arrow.
+    
+    The download starts with the first upstream page and memory stays bounded
+    by one chunk of rows (one row group for the columnar formats), however
+    large the range is.
+    """
+    export_format = request.format.lower()
+    args = (request.project_id, start_date, end_date, request.include_messages)
+    if export_format == "csv":
+        body = stream_csv(iter_transcript_records(*args), request.include_messages)
+        media_type, extension = "text/csv", "csv"
+    elif export_format == "ndjson":
+        body = stream_ndjson(iter_transcript_records(*args))
+        media_type, extension = "application/x-ndjson", "ndjson"
+    elif export_format in COLUMNAR_FORMATS:
+        body = stream_columnar(iter_transcript_chunks(*args), export_format, request.include_messages)
+        media_type, extension = COLUMNAR_FORMATS[export_format]
+    else:
+        raise HTTPException(status_code=400, detail="Transcript exports must be 'csv', 'ndjson', 'parquet' or 'arrow'")
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=transcripts_export.{extension}"}
+    )
+
 async def export_csv(data: dict):
     """Export data as CSV"""
     # Convert data to DataFrame
@@ -80,37 +162,22 @@ async def export_csv(data: dict):
         headers={"Content-Disposition": "attachment; filename=analytics_report.csv"}
     )
 
+def export_columnar_metrics(data: dict, export_format: str, start_date: str, end_date: str):
+    """Export the period's metrics as a one-row typed Parquet file or Arrow stream"""
+    media_type, extension = COLUMNAR_FORMATS[export_format]
+    return StreamingResponse(
+        io.BytesIO(encode_table(metrics_table(data, start_date, end_date), export_format)),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=analytics_report.{extension}"}
+    )
+
 async def export_pdf(data: dict, request: ExportRequest):
-    """Export data as PDF"""
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    story = []
-    
-    # Title
-    title = Paragraph("AI Helpdesk Analytics Report", styles['Title'])
-    story.append(title)
-    story.append(Spacer(1, 12))
-    
-    # Date range
-    date_range = Paragraph(f"Period: {request.start} to {request.end}", styles['Normal'])
-    story.append(date_range)
-    story.append(Spacer(1, 12))
-    
-    # Metrics
-    metrics = data.get("metrics", {})
-    for key, value in metrics.items():
-        metric_text = f"{key.replace('_', ' ').title()}: {value}"
-        story.append(Paragraph(metric_text, styles['Normal']))
-        story.append(Spacer(1, 6))
-    
-    # Build PDF
-    doc.build(story)
-    buffer.seek(0)
+    """Export data as PDF, rendered off the event loop (and cached) by the PDF renderer"""
+    pdf = await pdf_renderer.render(data, request.start, request.end)
     
     # Return as streaming response
     return StreamingResponse(
-        io.BytesIO(buffer.read()),
+        io.BytesIO(pdf),
         media_type="application/pdf",
         headers={"Content-Disposition": "attachment; filename=analytics_report.pdf"}
     )
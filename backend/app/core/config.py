@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 import os
 from dotenv import load_dotenv
 
@@ -11,14 +11,130 @@ class Settings(BaseSettings):
     voiceflow_api_key: str = os.getenv("VOICEFLOW_API_KEY", "demo_key")
     voiceflow_api_url: str = "https://analytics-api.voiceflow.com"
     
+    # Voiceflow HTTP client (shared connection pool)
+    voiceflow_http2: bool = True
+    voiceflow_max_connections: int = 20
+    voiceflow_max_keepalive_connections: int = 10
+    voiceflow_keepalive_expiry: float = 30.0
+    voiceflow_timeout: float = 30.0
+    voiceflow_connect_timeout: float = 5.0
+    voiceflow_pool_timeout: float = 10.0
+    
+    # v2 usage queries: split long ranges into windows fetched concurrently
+    voiceflow_usage_window_days: int = 7
+    voiceflow_usage_concurrency: int = 6
+    
+    # Transcript streaming: page size and number of pages requested ahead
+    voiceflow_transcript_page_size: int = 100
+    voiceflow_transcript_prefetch_pages: int = 4
+    
+    # Concurrent upstream fetches for the batch transcript messages endpoint
+    transcript_messages_batch_concurrency: int = 8
+    
+    # Streaming transcript exports: rows per written chunk and concurrent message fetches
+    export_chunk_rows: int = 500
+    export_message_concurrency: int = 8
+    # Parquet/Arrow exports: rows per row group and column compression codec. Row groups
+    # start at export_chunk_rows and grow to export_row_group_rows; export_row_group_bytes
+    # caps how much is buffered for one regardless of row count
+    export_row_group_rows: int = 50000
+    export_row_group_bytes: int = 64 * 1024 * 1024
+    export_compression: str = "zstd"
+    # Processes rendering PDF reports
+    pdf_render_workers: int = 2
+    
+    # Background export jobs: job table, artifact directory, worker pool size and
+    # how long finished artifacts are kept before cleanup. Idle workers poll the
+    # job table for queued jobs every export_job_poll_seconds. Running jobs
+    # heartbeat; one whose heartbeat is older than export_job_stale_seconds (its
+    # process died) is queued again.
+    export_jobs_url: str = "sqlite:///./export_jobs.db"
+    export_storage_dir: str = "./exports"
+    export_job_workers: int = 2
+    export_job_ttl_hours: int = 24
+    export_cleanup_interval_seconds: int = 600
+    export_job_heartbeat_seconds: int = 15
+    export_job_stale_seconds: int = 60
+    export_job_poll_seconds: float = 5.0
+    
     # Cache settings
     redis_url: Optional[str] = os.getenv("REDIS_URL")
+    redis_max_connections: int = 50
+    redis_socket_timeout: float = 2.0
+    redis_connect_timeout: float = 2.0
     supabase_url: Optional[str] = os.getenv("SUPABASE_URL")
     supabase_key: Optional[str] = os.getenv("SUPABASE_KEY")
     
+    # Local transcript warehouse: SQLite by default; a postgresql:// URL (e.g. the
+    # Supabase database connection string) needs the optional psycopg package
+    warehouse_enabled: bool = False
+    warehouse_url: str = "sqlite:///./warehouse.db"
+    warehouse_projects: List[str] = []
+    warehouse_sync_interval_seconds: int = 300
+    warehouse_backfill_days: int = 90
+    warehouse_sync_overlap_hours: int = 24
+    warehouse_sync_concurrency: int = 4
+    
     # Cache TTL in minutes
     cache_ttl_minutes: int = 5
     
+    # Per-endpoint cache policies in seconds (keyed by cache key prefix):
+    # fresh until soft_ttl, then served stale with a background refresh until hard_ttl
+    cache_policies: Dict[str, Dict[str, int]] = {
+        "overview": {"soft_ttl": 300, "hard_ttl": 3600},
+        "intents": {"soft_ttl": 300, "hard_ttl": 3600},
+        "transcripts": {"soft_ttl": 120, "hard_ttl": 1800},
+        # Messages of in-progress conversations; finished ones go to the immutable tier
+        "transcript_messages": {"soft_ttl": 60, "hard_ttl": 300},
+        "transcript_messages_raw": {"soft_ttl": 60, "hard_ttl": 300},
+        # Per-day overview aggregates: closed days vs. the current (still changing) day
+        "overview_day": {"soft_ttl": 86400, "hard_ttl": 86400},
+        "overview_live": {"soft_ttl": 300, "hard_ttl": 300},
+        # Rendered PDFs, keyed by a hash of their inputs, so they never go stale
+        "export_pdf": {"soft_ttl": 86400, "hard_ttl": 86400},
+    }
+    
+    # Ranges that ended more than this long ago are treated as final (late
+    # evaluations and usage can still land shortly after the fact) and cached
+    # with the historical policy, optionally overridden per key prefix
+    cache_historical_lag_hours: int = 24
+    cache_historical_policy: Dict[str, int] = {"soft_ttl": 86400, "hard_ttl": 7 * 86400}
+    cache_historical_policies: Dict[str, Dict[str, int]] = {
+        "transcripts": {"soft_ttl": 6 * 3600, "hard_ttl": 86400},
+    }
+    
+    # Fallback (degraded) payloads are cached only briefly, with jitter; for these
+    # prefixes the last good value is kept and served, flagged stale, instead
+    cache_negative_ttl_seconds: int = 30
+    cache_negative_ttl_jitter: float = 0.5
+    cache_last_good_prefixes: List[str] = ["overview", "intents", "transcripts"]
+    cache_last_good_ttl_seconds: int = 7 * 86400
+    
+    # Immutable tier for finished transcripts: in-process LRU bounds, Redis TTL
+    # (0 = no expiry) and an optional size-bounded on-disk store
+    immutable_cache_max_entries: int = 5000
+    immutable_cache_max_bytes: int = 128 * 1024 * 1024
+    immutable_cache_ttl_seconds: int = 90 * 24 * 3600
+    immutable_cache_dir: Optional[str] = None
+    immutable_cache_disk_max_bytes: int = 1024 * 1024 * 1024
+    
+    # HyperLogLog precision for distinct-user sketches (~1.04/sqrt(2**p) error)
+    hll_precision: int = 12
+    # KLL quantile sketch size for duration percentiles (~1.7/k rank error)
+    quantile_sketch_k: int = 200
+    
+    # granularity="auto" picks the finest chart bucket size giving at most this many points
+    chart_auto_max_buckets: int = 200
+    
+    # In-process L1 cache in front of Redis
+    memory_cache_max_entries: int = 2000
+    memory_cache_max_bytes: int = 64 * 1024 * 1024
+    memory_cache_max_ttl_seconds: int = 60
+    
+    # Cross-worker fetch lock (single-flight across gunicorn workers/instances)
+    cache_lock_timeout_seconds: float = 30.0
+    cache_lock_poll_interval_seconds: float = 0.1
+    
     model_config = {"env_file": ".env"}
 
 settings = Settings()
@@ -1,12 +1,39 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import analytics, export
 from app.core.config import settings
+from app.services.voiceflow_client import voiceflow_client
+from app.services.cache import cache_service
+from app.services.export_jobs import export_jobs
+from app.services.immutable_cache import immutable_cache
+from app.services.pdf_report import pdf_renderer
+from app.services.warehouse import warehouse, warehouse_sync
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: open shared upstream connections
+    await voiceflow_client.startup()
+    await cache_service.connect()
+    if settings.warehouse_enabled:
+        await warehouse.connect()
+        if warehouse.enabled:
+            warehouse_sync.start()
+    await export_jobs.start(export.export_report)
+    yield
+    # Shutdown: close pooled connections cleanly
+    await export_jobs.stop()
+    pdf_renderer.close()
+    await warehouse_sync.stop()
+    await warehouse.close()
+    await cache_service.close()
+    await voiceflow_client.close()
 
 app = FastAPI(
     title="AI Helpdesk Dashboard API",
     description="Backend API for the AI Helpdesk Dashboard",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -36,6 +63,10 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/cache/stats")
+async def cache_stats():
+    return {**cache_service.stats(), "immutable": immutable_cache.stats()}
+
 if __name__ == "__main__":
     import uvicorn
     import os
@@ -1,22 +1,57 @@
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, Dict, Any
 from datetime import datetime
 
+ChartGranularity = Literal["hour", "day", "week", "month", "auto"]
+
 class OverviewRequest(BaseModel):
     project_id: str
     start: str
     end: str
+    # Re-aggregate interactions_chart server-side; None keeps the raw series
+    granularity: Optional[ChartGranularity] = None
+    # Downsample interactions_chart to at most this many points (LTTB)
+    max_points: Optional[int] = Field(default=None, ge=3)
 
 class CompareRequest(BaseModel):
     project_id: str
     start: str
     end: str
+    granularity: Optional[ChartGranularity] = None
+    max_points: Optional[int] = Field(default=None, ge=3)
+
+class ChatMessage(BaseModel):
+    # All optional so a `fields` selection can return any subset
+    type: Optional[str] = None
+    role: Optional[str] = None
+    text: Optional[str] = None
+    timestamp: Optional[str] = None
+    raw_data: Optional[Dict[str, Any]] = None  # only with include_raw
+
+class TranscriptMessagesRequest(BaseModel):
+    transcript_ids: List[str] = Field(min_length=1, max_length=200)
+    include_raw: bool = False
+    fields: Optional[str] = None  # comma-separated subset of type,role,text,timestamp,raw_data
 
 class ExportRequest(BaseModel):
     project_id: str
     start: str
     end: str
-    format: str  # "csv" or "pdf"
+    format: str  # "csv", "pdf", "parquet", "arrow" or (transcripts only) "ndjson"
+    # "summary" exports the overview metrics; "transcripts" streams every transcript in the range
+    dataset: Literal["summary", "transcripts"] = "summary"
+    include_messages: bool = False
+
+class ExportJobResponse(BaseModel):
+    id: str
+    status: str  # "queued", "running", "succeeded", "failed" or "expired"
+    bytes_written: int
+    error: Optional[str] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    expires_at: Optional[str] = None
+    download_url: Optional[str] = None
 
 class KPIMetrics(BaseModel):
     total_interactions: int
@@ -25,11 +60,24 @@ class KPIMetrics(BaseModel):
     completion_rate: float
     satisfaction_score: float
 
+class Percentiles(BaseModel):
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p99: Optional[float] = None
+
+class DistributionPercentiles(BaseModel):
+    session_duration: Percentiles
+    sentiment: Percentiles
+
 class OverviewResponse(BaseModel):
     metrics: KPIMetrics
     interactions_chart: List[Dict[str, Any]]
     top_intents: List[Dict[str, Any]]
     sentiment_distribution: Dict[str, int]
+    percentiles: Optional[DistributionPercentiles] = None
+    # Set when upstream failed and this is the last known good data
+    stale: bool = False
+    stale_as_of: Optional[str] = None
 
 class CompareResponse(BaseModel):
     current: OverviewResponse
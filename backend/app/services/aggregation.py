@@ -0,0 +1,259 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from app.core.config import settings
+from app.models.analytics import DistributionPercentiles, KPIMetrics, Percentiles
+from app.services.sketches import HyperLogLog, KLLSketch
+
+PERCENTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+
+# Defaults used when a range has no transcripts to compute from
+DEFAULT_SESSION_DURATION = 180.5
+DEFAULT_SATISFACTION = 3.0
+DEFAULT_COMPLETION_RATE = 0.75
+DEFAULT_SENTIMENT_DISTRIBUTION = {"positive": 60, "neutral": 30, "negative": 10}
+
+# Counters that merge by plain addition
+_COUNTERS = (
+    "interactions", "unique_users", "transcripts", "duration_sum", "duration_count",
+    "sentiment_sum", "sentiment_count", "resolved"
+)
+
+def fallback_overview(error: Exception) -> Dict[str, Any]:
+    """Mock payload returned when the Voiceflow API fails"""
+    return {
+        "metrics": {
+            "total_interactions": 0,
+            "unique_users": 0,
+            "avg_session_duration": DEFAULT_SESSION_DURATION,
+            "completion_rate": DEFAULT_COMPLETION_RATE,
+            "satisfaction_score": 4.2
+        },
+        "interactions_chart": [],
+        "top_intents": [],
+        "sentiment_distribution": dict(DEFAULT_SENTIMENT_DISTRIBUTION),
+        "error": str(error)
+    }
+
+class OverviewAggregator:
+    """Mergeable running totals for the overview metrics.
+
+    Transcripts are ingested one at a time in a single pass: each property and
+    evaluation is routed by name through a dispatch table, so every value is
+    looked at and parsed once. Partial aggregates (e.g. one per day) combine
+    with merge() and round-trip through to_dict()/from_dict() for caching.
+    """
+
+    def __init__(self):
+        self.interactions = 0
+        self.unique_users = 0
+        self.transcripts = 0
+        self.duration_sum = 0
+        self.duration_count = 0
+        self.sentiment_sum = 0
+        self.sentiment_count = 0
+        self.resolved = 0
+        self.sentiment_hist: Dict[str, int] = {}
+        self.intents: Dict[str, int] = {}
+        self.chart: List[Dict[str, Any]] = []
+        # Distinct transcript sessionIDs; unlike summed per-period counts this
+        # merges across buckets without double-counting returning users
+        self.users = HyperLogLog(settings.hll_precision)
+        # Session duration distribution, for percentiles over any merged range
+        self.durations = KLLSketch(settings.quantile_sketch_k)
+
+    # Ingestion
+
+    def add_transcript(self, transcript: Dict[str, Any]):
+        self.transcripts += 1
+        session_id = transcript.get("sessionID")
+        if session_id:
+            self.users.add(session_id)
+        for prop in transcript.get("properties", ()):
+            handler = _PROPERTY_HANDLERS.get(prop.get("name"))
+            if handler is not None:
+                handler(self, prop)
+        for evaluation in transcript.get("evaluations", ()):
+            handler = _EVALUATION_HANDLERS.get(evaluation.get("name"))
+            if handler is not None:
+                handler(self, evaluation)
+
+    def add_transcripts(self, transcripts: Iterable[Dict[str, Any]]):
+        for transcript in transcripts:
+            self.add_transcript(transcript)
+
+    def add_interactions(self, items: Iterable[Dict[str, Any]]):
+        for item in items:
+            count = item.get("count", 0)
+            self.interactions += count
+            self.chart.append({"date": item.get("period", ""), "interactions": count})
+
+    def add_unique_users(self, items: Iterable[Dict[str, Any]]):
+        for item in items:
+            self.unique_users += item.get("count", 0)
+
+    def add_intents(self, intents: Iterable[Dict[str, Any]]):
+        for intent in intents:
+            name = intent.get("name", "")
+            self.intents[name] = self.intents.get(name, 0) + intent.get("count", 0)
+
+    # Handlers get the whole property/evaluation: a missing "value" falls back to
+    # the default, while an explicit null is skipped like any unparsable value
+
+    def _on_duration(self, prop: Dict[str, Any]):
+        try:
+            duration = int(prop.get("value", 0))
+        except (TypeError, ValueError):
+            return
+        self.duration_sum += duration
+        self.duration_count += 1
+        self.durations.add(duration)
+
+    def _on_sentiment(self, evaluation: Dict[str, Any]):
+        try:
+            score = int(evaluation.get("value", 3))
+        except (TypeError, ValueError):
+            return
+        self.sentiment_sum += score
+        self.sentiment_count += 1
+        key = str(score)
+        self.sentiment_hist[key] = self.sentiment_hist.get(key, 0) + 1
+
+    def _on_resolution(self, evaluation: Dict[str, Any]):
+        if evaluation.get("value") == "true":
+            self.resolved += 1
+
+    # Combining and serialization
+
+    def merge(self, other: "OverviewAggregator") -> "OverviewAggregator":
+        """Add another partial aggregate into this one (chart points are appended in order)"""
+        for name in _COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for name, count in other.sentiment_hist.items():
+            self.sentiment_hist[name] = self.sentiment_hist.get(name, 0) + count
+        for name, count in other.intents.items():
+            self.intents[name] = self.intents.get(name, 0) + count
+        self.chart.extend(other.chart)
+        self.users.merge(other.users)
+        self.durations.merge(other.durations)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in _COUNTERS}
+        data["sentiment_hist"] = dict(self.sentiment_hist)
+        data["intents"] = dict(self.intents)
+        data["chart"] = list(self.chart)
+        data["users"] = self.users.to_str()
+        data["durations"] = self.durations.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "OverviewAggregator":
+        aggregator = cls()
+        for name in _COUNTERS:
+            setattr(aggregator, name, data.get(name, 0))
+        aggregator.sentiment_hist = dict(data.get("sentiment_hist", {}))
+        aggregator.intents = dict(data.get("intents", {}))
+        aggregator.chart = list(data.get("chart", []))
+        if data.get("users"):
+            aggregator.users = HyperLogLog.from_str(data["users"])
+        if data.get("durations"):
+            aggregator.durations = KLLSketch.from_dict(data["durations"])
+        return aggregator
+
+    # Results
+
+    def distinct_users(self) -> int:
+        """Distinct users from the sessionID sketch, or the summed usage series
+        when no transcript carried a sessionID (e.g. entries cached before sketches)"""
+        if self.users.is_empty():
+            return self.unique_users
+        return self.users.count()
+
+    def kpis(self) -> KPIMetrics:
+        if self.transcripts:
+            avg_session_duration = (
+                self.duration_sum / self.duration_count if self.duration_count else DEFAULT_SESSION_DURATION
+            )
+            avg_sentiment = (
+                self.sentiment_sum / self.sentiment_count if self.sentiment_count else DEFAULT_SATISFACTION
+            )
+            completion_rate = self.resolved / self.transcripts
+        else:
+            avg_session_duration = DEFAULT_SESSION_DURATION
+            avg_sentiment = DEFAULT_SATISFACTION
+            completion_rate = DEFAULT_COMPLETION_RATE
+
+        return KPIMetrics(
+            total_interactions=self.interactions,
+            unique_users=self.distinct_users(),
+            avg_session_duration=round(avg_session_duration, 1),
+            completion_rate=round(completion_rate, 2),
+            satisfaction_score=round(avg_sentiment, 1)
+        )
+
+    def sentiment_distribution(self) -> Dict[str, int]:
+        """Positive (4-5) / negative (1-2) scores; everything else, including
+        transcripts without a sentiment evaluation, counts as neutral"""
+        if not self.transcripts:
+            return dict(DEFAULT_SENTIMENT_DISTRIBUTION)
+        positive = negative = 0
+        for score, count in self.sentiment_hist.items():
+            if int(score) >= 4:
+                positive += count
+            elif int(score) <= 2:
+                negative += count
+        return {
+            "positive": positive,
+            "neutral": self.transcripts - positive - negative,
+            "negative": negative
+        }
+
+    def percentiles(self) -> DistributionPercentiles:
+        """p50/p90/p99 of session duration (sketch) and sentiment (exact, from the histogram)"""
+        duration_values = self.durations.quantiles(list(PERCENTILES.values()))
+        return DistributionPercentiles(
+            session_duration=Percentiles(**dict(zip(PERCENTILES, duration_values))),
+            sentiment=Percentiles(**{
+                name: _histogram_quantile(self.sentiment_hist, q) for name, q in PERCENTILES.items()
+            })
+        )
+
+    def top_intents(self, limit: int = 10) -> List[Dict[str, Any]]:
+        ranked = sorted(self.intents.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+        return [
+            {
+                "intent": name,
+                "count": count,
+                "percentage": round(count / self.interactions * 100, 1) if self.interactions > 0 else 0
+            }
+            for name, count in ranked
+        ]
+
+    def to_overview(self, top_intents: int = 10) -> Dict[str, Any]:
+        """Overview payload in the OverviewResponse shape"""
+        return {
+            "metrics": self.kpis().model_dump(),
+            "interactions_chart": list(self.chart),
+            "top_intents": self.top_intents(top_intents),
+            "sentiment_distribution": self.sentiment_distribution(),
+            "percentiles": self.percentiles().model_dump()
+        }
+
+def _histogram_quantile(histogram: Dict[str, int], q: float) -> Optional[float]:
+    total = sum(histogram.values())
+    if not total:
+        return None
+    cumulative = 0
+    for score, count in sorted(histogram.items(), key=lambda kv: int(kv[0])):
+        cumulative += count
+        if cumulative >= q * total:
+            return float(score)
+    return None
+
+# Name -> handler dispatch tables used by add_transcript
+_PROPERTY_HANDLERS: Dict[str, Callable[[OverviewAggregator, Dict[str, Any]], None]] = {
+    "duration": OverviewAggregator._on_duration,
+}
+_EVALUATION_HANDLERS: Dict[str, Callable[[OverviewAggregator, Dict[str, Any]], None]] = {
+    "Customer sentiment": OverviewAggregator._on_sentiment,
+    "Resolution achieved": OverviewAggregator._on_resolution,
+}
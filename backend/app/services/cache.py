@@ -1,64 +1,453 @@
+import asyncio
 import json
-import redis
-from typing import Any, Optional, Callable
-from datetime import timedelta
+import random
+import time
+import uuid
+import redis.asyncio as aioredis
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Callable, Set, Tuple
 from app.core.config import settings
+from app.services.memory_cache import MemoryCache, MISSING
+from app.services.singleflight import SingleFlight
+
+# Delete the lock only if we still own it
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+class CachePolicy(NamedTuple):
+    """Soft TTL: serve as fresh. Hard TTL: serve stale and refresh until then."""
+    soft_ttl: float
+    hard_ttl: float
+
+def _ends_before(range_end: str, cutoff: float) -> bool:
+    try:
+        end = datetime.fromisoformat(range_end.replace('Z', '+00:00'))
+    except ValueError:
+        return False
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    return end.timestamp() < cutoff
+
+def _to_policy(policy: Dict[str, int]) -> CachePolicy:
+    return CachePolicy(policy["soft_ttl"], max(policy["hard_ttl"], policy["soft_ttl"]))
+
+def get_policy(cache_key: str, ttl_minutes: Optional[int] = None, range_end: Optional[str] = None) -> CachePolicy:
+    """Resolve the cache policy for a key.
+
+    An explicit ttl_minutes wins. Otherwise, a range that ended more than
+    cache_historical_lag_hours ago can no longer change, so it gets the
+    historical policy for its endpoint prefix (e.g. "overview:...") or the
+    default historical policy; ranges touching the present get the short
+    per-endpoint policy.
+    """
+    if ttl_minutes is not None:
+        return CachePolicy(ttl_minutes * 60, ttl_minutes * 60)
+    prefix = cache_key.split(":", 1)[0]
+    if range_end and _ends_before(range_end, time.time() - settings.cache_historical_lag_hours * 3600):
+        return _to_policy(settings.cache_historical_policies.get(prefix, settings.cache_historical_policy))
+    policy = settings.cache_policies.get(prefix)
+    if policy:
+        return _to_policy(policy)
+    default_ttl = settings.cache_ttl_minutes * 60
+    return CachePolicy(default_ttl, default_ttl)
+
+def is_degraded(data: Any) -> bool:
+    """Fallback payloads (e.g. fallback_overview) carry the upstream error in an "error" field"""
+    return isinstance(data, dict) and bool(data.get("error"))
+
+def _negative_ttl() -> float:
+    # Jitter spreads out the re-fetches of keys that failed together
+    return settings.cache_negative_ttl_seconds * (1 + random.random() * settings.cache_negative_ttl_jitter)
+
+def _keeps_last_good(cache_key: str) -> bool:
+    return cache_key.split(":", 1)[0] in settings.cache_last_good_prefixes
+
+class CachedFetchError(Exception):
+    """A fetch for this key failed moments ago; raised from the cache instead of retrying upstream"""
+
+def _entry_value(entry: Dict[str, Any]) -> Any:
+    """Value of an envelope; error envelopes ({"e": message, "t": stored_at}) re-raise the failure"""
+    if "e" in entry:
+        raise CachedFetchError(entry["e"])
+    return entry["v"]
 
 class CacheService:
     def __init__(self):
-        self.redis_client = None
-        if settings.redis_url:
+        self.redis_client: Optional[aioredis.Redis] = None
+        self._pool: Optional[aioredis.ConnectionPool] = None
+        # L1: in-process LRU in front of Redis (and the only tier without REDIS_URL)
+        self.memory = MemoryCache(
+            max_entries=settings.memory_cache_max_entries,
+            max_bytes=settings.memory_cache_max_bytes
+        )
+        self.redis_hits = 0
+        self.redis_misses = 0
+        # Concurrent misses for the same key share one fetch
+        self._inflight = SingleFlight()
+        # Stale-while-revalidate refreshes, kept referenced until they finish
+        self._background: Set[asyncio.Task] = set()
+
+    async def connect(self):
+        """Connect to Redis (called from the app lifespan, never at import time)"""
+        if not settings.redis_url or self.redis_client is not None:
+            return
+        try:
+            self._pool = aioredis.ConnectionPool.from_url(
+                settings.redis_url,
+                max_connections=settings.redis_max_connections,
+                socket_timeout=settings.redis_socket_timeout,
+                socket_connect_timeout=settings.redis_connect_timeout,
+                health_check_interval=30
+            )
+            self.redis_client = aioredis.Redis(connection_pool=self._pool)
+            # Test connection
+            await self.redis_client.ping()
+            print("Redis connection successful")
+        except Exception as e:
+            print(f"Redis connection failed: {e}")
+            await self.close()
+
+    async def close(self):
+        """Cancel background refreshes and close the Redis connection pool"""
+        for task in list(self._background):
+            task.cancel()
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        if self.redis_client is not None:
             try:
-                self.redis_client = redis.from_url(settings.redis_url)
-                # Test connection
-                self.redis_client.ping()
-                print("Redis connection successful")
+                await self.redis_client.aclose()
             except Exception as e:
-                print(f"Redis connection failed: {e}")
-                self.redis_client = None
-    
+                print(f"Redis close error: {e}")
+        if self._pool is not None:
+            await self._pool.disconnect()
+        self.redis_client = None
+        self._pool = None
+
     async def get_cached_or_fetch(
-        self, 
-        cache_key: str, 
-        fetch_fn: Callable, 
-        ttl_minutes: int = None
+        self,
+        cache_key: str,
+        fetch_fn: Callable,
+        ttl_minutes: int = None,
+        range_end: Optional[str] = None
     ) -> Any:
-        """Get data from cache or fetch and cache it"""
-        if ttl_minutes is None:
-            ttl_minutes = settings.cache_ttl_minutes
-        
+        """Get data from cache or fetch and cache it.
+
+        Entries younger than the soft TTL are served as-is; entries between the
+        soft and hard TTL are served stale while a background task refreshes
+        them; past the hard TTL the caller waits for a fresh fetch. Pass the
+        end of the queried date range as range_end so historical ranges get
+        long TTLs (see get_policy).
+        """
+        policy = get_policy(cache_key, ttl_minutes, range_end)
+
         # Try to get from cache first
+        entry = await self._get_entry(cache_key)
+        return await self._serve_entry(cache_key, entry, fetch_fn, policy)
+
+    async def get_cached_or_fetch_many(
+        self,
+        requests: List[Tuple[str, Callable, Optional[str]]]
+    ) -> List[Any]:
+        """get_cached_or_fetch for several (cache_key, fetch_fn, range_end) at once.
+
+        All keys are read in one Redis round-trip; only the misses and
+        expired entries are then fetched, concurrently. Results are returned
+        in request order.
+        """
+        entries = await self._get_entries([cache_key for cache_key, _, _ in requests])
+        return list(await asyncio.gather(*[
+            self._serve_entry(cache_key, entries[cache_key], fetch_fn, get_policy(cache_key, range_end=range_end))
+            for cache_key, fetch_fn, range_end in requests
+        ]))
+
+    async def _serve_entry(self, cache_key: str, entry: Any, fetch_fn: Callable, policy: "CachePolicy") -> Any:
+        """Serve a cached envelope according to the policy, fetching when it's missing or expired"""
+        if entry is not MISSING:
+            if "e" in entry:
+                # Negatively cached failure: expires with its short TTL
+                return _entry_value(entry)
+            age = time.time() - entry["t"]
+            if age < policy.soft_ttl:
+                return entry["v"]
+            if age < policy.hard_ttl:
+                self._refresh_in_background(cache_key, fetch_fn, policy)
+                return entry["v"]
+
+        # Fetch fresh data, coalescing concurrent misses in this worker
+        return await self._inflight.do(
+            cache_key, lambda: self._fetch_and_store(cache_key, fetch_fn, policy.hard_ttl)
+        )
+
+    def _refresh_in_background(self, cache_key: str, fetch_fn: Callable, policy: "CachePolicy"):
+        """Start a background refresh unless one is already running for this key"""
+        if cache_key in self._inflight:
+            return
+        task = asyncio.ensure_future(self._inflight.do(
+            cache_key,
+            lambda: self._fetch_and_store(cache_key, fetch_fn, policy.hard_ttl)
+        ))
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+
+    def _background_done(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Cache background refresh error: {task.exception()}")
+
+    async def _fetch_and_store(self, cache_key: str, fetch_fn: Callable, ttl_seconds: float) -> Any:
+        """Fetch and cache a value, holding a Redis lock so other workers wait for us"""
+        started = time.time()
+        token = await self._acquire_lock(cache_key)
+        if token is None:
+            # Another worker/instance is fetching this key: wait for its result
+            cached = await self._wait_for_value(cache_key, started)
+            if cached is not MISSING:
+                return cached
+            token = await self._acquire_lock(cache_key)
+
+        try:
+            try:
+                data = await fetch_fn()
+            except Exception as e:
+                # Upstream failed outright: fall back to the last known good value if there is one,
+                # otherwise remember the failure briefly so callers don't all retry upstream
+                data = await self._last_good(cache_key)
+                if data is MISSING:
+                    await self._store(cache_key, {"e": str(e), "t": time.time()}, _negative_ttl())
+                    raise
+                await self.set(cache_key, data, _negative_ttl())
+                return data
+
+            if is_degraded(data):
+                # Fallback payload: serve the last known good value instead if we have one,
+                # and cache whichever it is only briefly so recovery is picked up soon
+                last_good = await self._last_good(cache_key)
+                if last_good is not MISSING:
+                    data = last_good
+                await self.set(cache_key, data, _negative_ttl())
+            else:
+                await self.set(cache_key, data, ttl_seconds)
+                if _keeps_last_good(cache_key):
+                    # Only read on upstream failure, so it stays out of L1 while Redis is there
+                    await self.set(
+                        f"lkg:{cache_key}", data, settings.cache_last_good_ttl_seconds,
+                        l1=self.redis_client is None
+                    )
+        finally:
+            if token:
+                await self._release_lock(cache_key, token)
+
+        return data
+
+    async def _last_good(self, cache_key: str) -> Any:
+        """Last successfully fetched value for a key, flagged as stale, or MISSING"""
+        if not _keeps_last_good(cache_key):
+            return MISSING
+        lkg_key = f"lkg:{cache_key}"
         if self.redis_client:
+            entry = await self._get_redis_entry(lkg_key, backfill=False)
+        else:
+            entry = self.memory.get(lkg_key)
+        if entry is MISSING:
+            return MISSING
+        value = entry["v"]
+        if isinstance(value, dict):
+            as_of = datetime.fromtimestamp(entry["t"], timezone.utc).isoformat().replace('+00:00', 'Z')
+            value = {**value, "stale": True, "stale_as_of": as_of}
+        return value
+
+    async def _acquire_lock(self, cache_key: str) -> Optional[str]:
+        """Returns a lock token, "" when locking is unavailable, or None if the lock is held"""
+        if not self.redis_client:
+            return ""
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.redis_client.set(
+                f"lock:{cache_key}", token, nx=True,
+                px=int(settings.cache_lock_timeout_seconds * 1000)
+            )
+            return token if acquired else None
+        except Exception as e:
+            print(f"Cache lock error: {e}")
+            return ""
+
+    async def _release_lock(self, cache_key: str, token: str):
+        try:
+            await self.redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, f"lock:{cache_key}", token)
+        except Exception as e:
+            print(f"Cache unlock error: {e}")
+
+    async def _wait_for_value(self, cache_key: str, newer_than: float) -> Any:
+        """Poll Redis until the lock holder stores a value written after newer_than,
+        the lock goes away, or it times out"""
+        deadline = time.monotonic() + settings.cache_lock_timeout_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(settings.cache_lock_poll_interval_seconds)
             try:
-                cached = self.redis_client.get(cache_key)
-                if cached:
-                    return json.loads(cached)
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    cached, pttl, locked = await (
+                        pipe.get(cache_key).pttl(cache_key).exists(f"lock:{cache_key}").execute()
+                    )
             except Exception as e:
                 print(f"Cache read error: {e}")
-        
-        # Fetch fresh data
-        data = await fetch_fn()
-        
-        # Cache the data
+                return MISSING
+            entry = self._decode_entry(cache_key, cached, pttl)
+            if entry is not MISSING and entry["t"] >= newer_than:
+                self.redis_hits += 1
+                return _entry_value(entry)
+            if not locked:
+                return MISSING
+        return MISSING
+
+    async def get(self, cache_key: str) -> Any:
+        """Read a key from L1, then Redis; returns MISSING on a miss (or a cached failure)"""
+        entry = await self._get_entry(cache_key)
+        return entry.get("v", MISSING) if entry is not MISSING else MISSING
+
+    async def _get_entry(self, cache_key: str) -> Any:
+        """Read the {"v": value, "t": stored_at} envelope for a key, or MISSING"""
+        entry = self.memory.get(cache_key)
+        if entry is not MISSING:
+            return entry
+        return await self._get_redis_entry(cache_key)
+
+    async def _get_redis_entry(self, cache_key: str, backfill: bool = True) -> Any:
+        """Read an envelope from Redis alone (copied into L1 unless backfill is False), or MISSING"""
+        if not self.redis_client:
+            return MISSING
+        try:
+            # GET + PTTL in one round-trip so L1 expires together with Redis
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                cached, pttl = await pipe.get(cache_key).pttl(cache_key).execute()
+            entry = self._decode_entry(cache_key, cached, pttl, backfill)
+            if entry is not MISSING:
+                self.redis_hits += 1
+                return entry
+            self.redis_misses += 1
+        except Exception as e:
+            print(f"Cache read error: {e}")
+        return MISSING
+
+    async def get_many(self, cache_keys: Iterable[str], backfill: bool = True) -> Dict[str, Any]:
+        """Read several keys at once; missing keys map to MISSING.
+        With backfill=False, Redis hits are not copied into L1 (bulk reads)."""
+        entries = await self._get_entries(cache_keys, backfill)
+        return {key: entry.get("v", MISSING) if entry is not MISSING else MISSING for key, entry in entries.items()}
+
+    async def _get_entries(self, cache_keys: Iterable[str], backfill: bool = True) -> Dict[str, Any]:
+        """Envelopes for several keys: L1 first, then a single MGET + PTTL pipeline for the rest"""
+        entries = {key: self.memory.get(key) for key in cache_keys}
+        missing = [key for key, entry in entries.items() if entry is MISSING]
+        if not missing or not self.redis_client:
+            return entries
+
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.mget(missing)
+                for key in missing:
+                    pipe.pttl(key)
+                cached, *pttls = await pipe.execute()
+            for key, value, pttl in zip(missing, cached, pttls):
+                entry = self._decode_entry(key, value, pttl, backfill)
+                if entry is not MISSING:
+                    self.redis_hits += 1
+                    entries[key] = entry
+                else:
+                    self.redis_misses += 1
+        except Exception as e:
+            print(f"Cache read error: {e}")
+
+        return entries
+
+    def _decode_entry(self, cache_key: str, cached: Optional[bytes], pttl: int, backfill: bool = True) -> Any:
+        """Decode a Redis payload into an envelope and (unless backfill is False) populate L1 with it"""
+        if cached is None:
+            return MISSING
+        entry = json.loads(cached)
+        if not isinstance(entry, dict) or entry.keys() not in ({"v", "t"}, {"e", "t"}):
+            # Written by an older version without an envelope
+            return MISSING
+        if backfill:
+            self.memory.set(cache_key, entry, self._l1_ttl(pttl / 1000), len(cached))
+        return entry
+
+    async def set(self, cache_key: str, data: Any, ttl_seconds: float, l1: bool = True):
+        """Write a key to L1 (unless l1 is False) and Redis"""
+        await self._store(cache_key, {"v": data, "t": time.time()}, ttl_seconds, l1)
+
+    async def _store(self, cache_key: str, entry: Dict[str, Any], ttl_seconds: float, l1: bool = True):
+        try:
+            encoded = json.dumps(entry)
+        except (TypeError, ValueError) as e:
+            print(f"Cache encode error: {e}")
+            return
+
+        if l1:
+            self.memory.set(cache_key, entry, self._l1_ttl(ttl_seconds), len(encoded))
+
         if self.redis_client:
             try:
-                self.redis_client.setex(
-                    cache_key,
-                    timedelta(minutes=ttl_minutes),
-                    json.dumps(data)
-                )
+                await self.redis_client.setex(cache_key, max(1, int(ttl_seconds)), encoded)
             except Exception as e:
                 print(f"Cache write error: {e}")
-        
-        return data
-    
-    def invalidate(self, pattern: str):
+
+    async def set_many(self, items: Dict[str, Tuple[Any, float]]):
+        """Write several keys, given as {key: (data, ttl_seconds)}, with one pipelined Redis round-trip"""
+        now = time.time()
+        encoded_items = {}
+        for cache_key, (data, ttl_seconds) in items.items():
+            entry = {"v": data, "t": now}
+            try:
+                encoded = json.dumps(entry)
+            except (TypeError, ValueError) as e:
+                print(f"Cache encode error: {e}")
+                continue
+            self.memory.set(cache_key, entry, self._l1_ttl(ttl_seconds), len(encoded))
+            encoded_items[cache_key] = (encoded, ttl_seconds)
+
+        if self.redis_client and encoded_items:
+            try:
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    for cache_key, (encoded, ttl_seconds) in encoded_items.items():
+                        pipe.setex(cache_key, max(1, int(ttl_seconds)), encoded)
+                    await pipe.execute()
+            except Exception as e:
+                print(f"Cache write error: {e}")
+
+    def _l1_ttl(self, ttl_seconds: float) -> float:
+        """L1 entries never outlive their Redis copy; with Redis they are also capped
+        so other workers' writes and invalidations become visible quickly"""
+        if ttl_seconds < 0:
+            # PTTL -1: key has no expiry in Redis
+            ttl_seconds = settings.memory_cache_max_ttl_seconds
+        if self.redis_client:
+            return min(ttl_seconds, settings.memory_cache_max_ttl_seconds)
+        return ttl_seconds
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for each cache tier"""
+        return {
+            "l1": self.memory.stats(),
+            "redis": {
+                "enabled": self.redis_client is not None,
+                "hits": self.redis_hits,
+                "misses": self.redis_misses
+            }
+        }
+
+    async def invalidate(self, pattern: str):
         """Invalidate cache entries matching pattern"""
+        self.memory.delete_pattern(pattern)
         if self.redis_client:
             try:
-                keys = self.redis_client.keys(pattern)
+                # SCAN instead of KEYS so large keyspaces don't block Redis
+                keys = [key async for key in self.redis_client.scan_iter(match=pattern, count=500)]
                 if keys:
-                    self.redis_client.delete(*keys)
+                    await self.redis_client.delete(*keys)
             except Exception as e:
                 print(f"Cache invalidation error: {e}")
 
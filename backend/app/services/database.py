@@ -0,0 +1,94 @@
+import sqlite3
+import threading
+from typing import Any, Iterable, List, Sequence, Tuple
+
+class Database:
+    """Thin DB-API wrapper: SQLite by default, Postgres when psycopg is installed.
+
+    Calls are serialized with a lock and are blocking; callers run them in a
+    worker thread so the event loop never waits on disk or network I/O.
+    """
+
+    def __init__(self, url: str):
+        if url.startswith("sqlite:///"):
+            path = url[len("sqlite:///"):] or ":memory:"
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.placeholder = "?"
+        elif url.startswith(("postgres://", "postgresql://")):
+            try:
+                import psycopg
+            except ImportError as e:
+                raise RuntimeError("A Postgres database url requires the 'psycopg' package") from e
+            self.conn = psycopg.connect(url)
+            self.placeholder = "%s"
+        else:
+            raise ValueError(f"Unsupported database url: {url}")
+        self._lock = threading.Lock()
+
+    def _sql(self, sql: str) -> str:
+        return sql if self.placeholder == "?" else sql.replace("?", self.placeholder)
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[Tuple]:
+        with self._lock:
+            cursor = self.conn.cursor()
+            try:
+                cursor.execute(self._sql(sql), params)
+                rows = cursor.fetchall()
+                # End the read's implicit transaction (psycopg isn't autocommit), so the
+                # connection neither idles in a transaction nor stays aborted after an error
+                self.conn.commit()
+                return rows
+            except Exception:
+                self.conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Run one write statement in its own transaction and return the affected row count"""
+        with self._lock:
+            cursor = self.conn.cursor()
+            try:
+                cursor.execute(self._sql(sql), params)
+                count = cursor.rowcount
+                self.conn.commit()
+                return count
+            except Exception:
+                self.conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def execute_all(self, statements: Iterable[str]):
+        """Run parameterless statements (e.g. DDL) in one transaction"""
+        with self._lock:
+            cursor = self.conn.cursor()
+            try:
+                for sql in statements:
+                    cursor.execute(sql)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def write(self, statements: Iterable[Tuple[str, Sequence[Sequence[Any]]]]):
+        """Run (sql, rows) pairs with executemany in a single transaction"""
+        with self._lock:
+            cursor = self.conn.cursor()
+            try:
+                for sql, rows in statements:
+                    if rows:
+                        cursor.executemany(self._sql(sql), rows)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
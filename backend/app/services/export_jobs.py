@@ -0,0 +1,337 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from fastapi import HTTPException
+from starlette.responses import StreamingResponse
+from app.core.config import settings
+from app.models.analytics import ExportRequest
+from app.services.database import Database
+from app.services.warehouse import to_utc_iso
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS export_jobs (
+        id TEXT PRIMARY KEY,
+        dedupe_key TEXT NOT NULL,
+        status TEXT NOT NULL,
+        request TEXT NOT NULL,
+        media_type TEXT,
+        filename TEXT,
+        path TEXT,
+        bytes_written INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        created_at TEXT NOT NULL,
+        started_at TEXT,
+        finished_at TEXT,
+        expires_at TEXT,
+        heartbeat_at TEXT
+    )
+    """,
+    # At most one queued/running job per identical request; duplicates join it
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_export_jobs_inflight
+    ON export_jobs (dedupe_key) WHERE status IN ('queued', 'running')
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_export_jobs_expires ON export_jobs (status, expires_at)",
+]
+
+# Job tables created before heartbeat_at existed
+MIGRATIONS = [
+    "ALTER TABLE export_jobs ADD COLUMN heartbeat_at TEXT",
+]
+
+_COLUMNS = (
+    "id", "dedupe_key", "status", "request", "media_type", "filename", "path",
+    "bytes_written", "error", "created_at", "started_at", "finished_at", "expires_at"
+)
+
+# Progress is persisted at most this often while an artifact is being written
+_PROGRESS_INTERVAL_SECONDS = 1.0
+
+def _now() -> str:
+    return to_utc_iso(datetime.now(timezone.utc).isoformat())
+
+def _stale_before() -> str:
+    moment = datetime.now(timezone.utc) - timedelta(seconds=settings.export_job_stale_seconds)
+    return to_utc_iso(moment.isoformat())
+
+def _dedupe_key(request: ExportRequest) -> str:
+    payload = request.model_dump()
+    payload["format"] = payload["format"].lower()
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+def _remove_if_exists(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+def _filename(response: StreamingResponse, default: str) -> str:
+    match = re.search(r'filename="?([^";]+)"?', response.headers.get("content-disposition", ""))
+    return match.group(1) if match else default
+
+class ExportJobManager:
+    """Background export jobs: a persistent job table, a bounded worker pool and artifact expiry.
+
+    Jobs render through the same export function as POST /api/export/ and
+    write its response body to export_storage_dir. The job table is the
+    queue, so several processes can share it: idle workers poll it and claim
+    the oldest queued job with a conditional UPDATE, so each job runs once.
+    Running jobs heartbeat so ones left behind by a dead process are queued
+    again, and jobs interrupted by a shutdown are queued again right away.
+    """
+
+    def __init__(self):
+        self.db: Optional[Database] = None
+        self._render: Optional[Callable[[ExportRequest], Awaitable[StreamingResponse]]] = None
+        # Set on submit so idle workers here don't wait for the next poll
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._submit_lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.db is not None
+
+    async def start(self, render: Callable[[ExportRequest], Awaitable[StreamingResponse]]):
+        if self.db is not None:
+            return
+        try:
+            await asyncio.to_thread(os.makedirs, settings.export_storage_dir, exist_ok=True)
+            self.db = await asyncio.to_thread(Database, settings.export_jobs_url)
+            await asyncio.to_thread(self.db.execute_all, SCHEMA)
+            for migration in MIGRATIONS:
+                try:
+                    await asyncio.to_thread(self.db.execute_all, [migration])
+                except Exception:
+                    # Already applied
+                    pass
+            await self.requeue_stale()
+        except Exception as e:
+            print(f"Export job store connection failed: {e}")
+            self.db = None
+            return
+
+        self._render = render
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(max(1, settings.export_job_workers))]
+        self._tasks.append(asyncio.ensure_future(self._cleanup_loop()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.db is not None:
+            await asyncio.to_thread(self.db.close)
+            self.db = None
+
+    # Jobs
+
+    async def submit(self, request: ExportRequest) -> Dict[str, Any]:
+        """Queue an export, or return the identical job already queued or running"""
+        key = _dedupe_key(request)
+        async with self._submit_lock:
+            existing = await self._find_inflight(key)
+            if existing is not None:
+                return existing
+            job_id = uuid.uuid4().hex
+            try:
+                await asyncio.to_thread(self.db.write, [(
+                    "INSERT INTO export_jobs (id, dedupe_key, status, request, created_at) VALUES (?, ?, 'queued', ?, ?)",
+                    [(job_id, key, request.model_dump_json(), _now())]
+                )])
+            except Exception:
+                # Another process inserted the same job first (unique in-flight index)
+                existing = await self._find_inflight(key)
+                if existing is None:
+                    raise
+                return existing
+        self._wakeup.set()
+        return await self.get(job_id)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = await asyncio.to_thread(
+            self.db.query, f"SELECT {', '.join(_COLUMNS)} FROM export_jobs WHERE id = ?", (job_id,)
+        )
+        return dict(zip(_COLUMNS, rows[0])) if rows else None
+
+    async def _find_inflight(self, key: str) -> Optional[Dict[str, Any]]:
+        rows = await asyncio.to_thread(
+            self.db.query,
+            "SELECT id FROM export_jobs WHERE dedupe_key = ? AND status IN ('queued', 'running')",
+            (key,)
+        )
+        return await self.get(rows[0][0]) if rows else None
+
+    async def _claim_next(self) -> Optional[str]:
+        """Claim the oldest queued job, or None when there is nothing to run"""
+        rows = await asyncio.to_thread(
+            self.db.query,
+            "SELECT id FROM export_jobs WHERE status = 'queued' ORDER BY created_at LIMIT ?",
+            (max(1, settings.export_job_workers),)
+        )
+        for (job_id,) in rows:
+            if await self._claim(job_id):
+                return job_id
+        return None
+
+    async def _claim(self, job_id: str) -> bool:
+        """Atomically move a queued job to running; False if another worker got it first"""
+        now = _now()
+        claimed = await asyncio.to_thread(
+            self.db.execute,
+            "UPDATE export_jobs SET status = 'running', started_at = ?, heartbeat_at = ? WHERE id = ? AND status = 'queued'",
+            (now, now, job_id)
+        )
+        return claimed == 1
+
+    async def requeue_stale(self) -> List[str]:
+        """Queue again running jobs whose process stopped heartbeating (they start over from scratch)"""
+        rows = await asyncio.to_thread(
+            self.db.query,
+            "SELECT id FROM export_jobs WHERE status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+            (_stale_before(),)
+        )
+        requeued = []
+        for (job_id,) in rows:
+            # Conditional as well, so two processes don't both requeue a job that has just been claimed
+            reset = await asyncio.to_thread(
+                self.db.execute,
+                """
+                UPDATE export_jobs SET status = 'queued', started_at = NULL, bytes_written = 0
+                WHERE id = ? AND status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?)
+                """,
+                (job_id, _stale_before())
+            )
+            if reset:
+                requeued.append(job_id)
+        return requeued
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(settings.export_job_heartbeat_seconds)
+            try:
+                await self._update(job_id, heartbeat_at=_now())
+            except Exception as e:
+                print(f"Export job {job_id} heartbeat error: {e}")
+
+    async def _update(self, job_id: str, **fields: Any):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        await asyncio.to_thread(self.db.write, [(
+            f"UPDATE export_jobs SET {assignments} WHERE id = ?", [(*fields.values(), job_id)]
+        )])
+
+    # Workers
+
+    async def _worker(self):
+        while True:
+            # Cleared before looking, so a submit that lands meanwhile still wakes us
+            self._wakeup.clear()
+            try:
+                job_id = await self._claim_next()
+            except Exception as e:
+                print(f"Export job claim error: {e}")
+                job_id = None
+            if job_id is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), settings.export_job_poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Export job {job_id} failed: {e}")
+
+    async def _run(self, job_id: str):
+        """Render a claimed job into its artifact file"""
+        job = await self.get(job_id)
+        path = os.path.join(settings.export_storage_dir, job_id)
+        partial = f"{path}.{os.getpid()}.part"
+        heartbeat = asyncio.ensure_future(self._heartbeat(job_id))
+
+        try:
+            response = await self._render(ExportRequest.model_validate_json(job["request"]))
+            written = 0
+            last_progress = time.monotonic()
+            # File operations run in threads so a slow disk doesn't stall the event loop
+            f = await asyncio.to_thread(open, partial, "wb")
+            try:
+                async for chunk in response.body_iterator:
+                    data = chunk if isinstance(chunk, bytes) else chunk.encode()
+                    await asyncio.to_thread(f.write, data)
+                    written += len(data)
+                    if time.monotonic() - last_progress >= _PROGRESS_INTERVAL_SECONDS:
+                        await self._update(job_id, bytes_written=written)
+                        last_progress = time.monotonic()
+            finally:
+                await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.replace, partial, path)
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back to the queue for another process or the next startup
+            await asyncio.to_thread(_remove_if_exists, partial)
+            await self._update(job_id, status="queued", started_at=None, heartbeat_at=None, bytes_written=0)
+            raise
+        except Exception as e:
+            await asyncio.to_thread(_remove_if_exists, partial)
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            await self._finish(job_id, status="failed", error=str(error))
+            return
+        finally:
+            heartbeat.cancel()
+
+        await self._finish(
+            job_id,
+            status="succeeded",
+            path=path,
+            media_type=response.media_type,
+            filename=_filename(response, job_id),
+            bytes_written=written
+        )
+
+    async def _finish(self, job_id: str, **fields: Any):
+        finished = datetime.now(timezone.utc)
+        expires = finished + timedelta(hours=settings.export_job_ttl_hours)
+        await self._update(
+            job_id,
+            finished_at=to_utc_iso(finished.isoformat()),
+            expires_at=to_utc_iso(expires.isoformat()),
+            **fields
+        )
+
+    # Expiry
+
+    async def _cleanup_loop(self):
+        while True:
+            try:
+                await self.cleanup_expired()
+                if await self.requeue_stale():
+                    self._wakeup.set()
+            except Exception as e:
+                print(f"Export cleanup error: {e}")
+            await asyncio.sleep(settings.export_cleanup_interval_seconds)
+
+    async def cleanup_expired(self) -> int:
+        """Delete artifacts of finished jobs past their expiry and mark the jobs expired"""
+        rows = await asyncio.to_thread(
+            self.db.query,
+            "SELECT id, path FROM export_jobs WHERE status IN ('succeeded', 'failed') AND expires_at < ?",
+            (_now(),)
+        )
+        for _, path in rows:
+            if path:
+                await asyncio.to_thread(_remove_if_exists, path)
+        await asyncio.to_thread(self.db.write, [(
+            "UPDATE export_jobs SET status = 'expired', path = NULL WHERE id = ?",
+            [(job_id,) for job_id, _ in rows]
+        )])
+        return len(rows)
+
+# Global instance
+export_jobs = ExportJobManager()
@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+from app.core.config import settings
+from app.services.cache import cache_service
+from app.services.memory_cache import MemoryCache, MISSING
+
+class ImmutableCache:
+    """Cache tier for values that never change once written (e.g. finished transcripts).
+
+    There is no staleness to manage, so entries live until evicted: a
+    size-bounded in-process LRU, an optional size-bounded on-disk store and
+    Redis with a long TTL (immutable_cache_ttl_seconds; 0 keeps keys until
+    Redis itself evicts them). Reads fall through L1 -> disk -> Redis and
+    backfill the faster tiers.
+    """
+
+    def __init__(self):
+        self.memory = MemoryCache(settings.immutable_cache_max_entries, settings.immutable_cache_max_bytes)
+        self.disk_dir: Optional[str] = settings.immutable_cache_dir
+        self._disk_bytes: Optional[int] = None
+        self.disk_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Any:
+        """Return the stored value or MISSING"""
+        value = self.memory.get(key)
+        if value is not MISSING:
+            return value
+
+        encoded = None
+        if self.disk_dir:
+            encoded = await asyncio.to_thread(self._disk_read, key)
+            if encoded is not None:
+                self.disk_hits += 1
+
+        if encoded is None and cache_service.redis_client:
+            try:
+                encoded = await cache_service.redis_client.get(key)
+            except Exception as e:
+                print(f"Immutable cache get error: {e}")
+            if encoded is not None:
+                self.redis_hits += 1
+                encoded = encoded.decode() if isinstance(encoded, bytes) else encoded
+                if self.disk_dir:
+                    await asyncio.to_thread(self._disk_write, key, encoded)
+
+        if encoded is None:
+            self.misses += 1
+            return MISSING
+        value = json.loads(encoded)
+        self.memory.set(key, value, float("inf"), len(encoded))
+        return value
+
+    async def get_many(self, keys: Iterable[str], backfill: bool = True) -> Dict[str, Any]:
+        """get for several keys: one disk pass and a single Redis MGET for the L1 misses.
+        With backfill=False the faster tiers are left untouched (bulk reads)."""
+        values = {key: self.memory.get(key) for key in keys}
+        missing = [key for key, value in values.items() if value is MISSING]
+        encoded: Dict[str, str] = {}
+
+        if missing and self.disk_dir:
+            encoded = await asyncio.to_thread(self._disk_read_many, missing)
+            self.disk_hits += len(encoded)
+            missing = [key for key in missing if key not in encoded]
+
+        if missing and cache_service.redis_client:
+            from_redis: Dict[str, str] = {}
+            try:
+                for key, value in zip(missing, await cache_service.redis_client.mget(missing)):
+                    if value is not None:
+                        from_redis[key] = value.decode() if isinstance(value, bytes) else value
+            except Exception as e:
+                print(f"Immutable cache get error: {e}")
+            self.redis_hits += len(from_redis)
+            if from_redis and self.disk_dir and backfill:
+                await asyncio.to_thread(self._disk_write_many, from_redis)
+            encoded.update(from_redis)
+
+        for key in missing:
+            if key not in encoded:
+                self.misses += 1
+        for key, raw in encoded.items():
+            values[key] = json.loads(raw)
+            if backfill:
+                self.memory.set(key, values[key], float("inf"), len(raw))
+        return values
+
+    async def set(self, key: str, value: Any):
+        try:
+            encoded = json.dumps(value)
+        except (TypeError, ValueError) as e:
+            print(f"Immutable cache encode error: {e}")
+            return
+
+        self.memory.set(key, value, float("inf"), len(encoded))
+        if self.disk_dir:
+            await asyncio.to_thread(self._disk_write, key, encoded)
+        if cache_service.redis_client:
+            try:
+                await cache_service.redis_client.set(key, encoded, ex=settings.immutable_cache_ttl_seconds or None)
+            except Exception as e:
+                print(f"Immutable cache set error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "l1": self.memory.stats(),
+            "disk": {"enabled": bool(self.disk_dir), "hits": self.disk_hits, "bytes": self._disk_bytes},
+            "redis_hits": self.redis_hits,
+            "misses": self.misses
+        }
+
+    # On-disk store (blocking; called in a worker thread)
+
+    def _disk_path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.disk_dir, digest[:2], f"{digest}.json")
+
+    def _disk_read(self, key: str) -> Optional[str]:
+        path = self._disk_path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                encoded = f.read()
+            # Reads refresh the mtime that eviction orders by
+            os.utime(path)
+            return encoded
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"Immutable cache disk read error: {e}")
+            return None
+
+    def _disk_read_many(self, keys: List[str]) -> Dict[str, str]:
+        found = {}
+        for key in keys:
+            encoded = self._disk_read(key)
+            if encoded is not None:
+                found[key] = encoded
+        return found
+
+    def _disk_write_many(self, items: Dict[str, str]):
+        for key, encoded in items.items():
+            self._disk_write(key, encoded)
+
+    def _disk_write(self, key: str, encoded: str):
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            existing = os.path.getsize(path) if os.path.exists(path) else 0
+            partial = f"{path}.{os.getpid()}.tmp"
+            with open(partial, "w", encoding="utf-8") as f:
+                f.write(encoded)
+            os.replace(partial, path)
+        except OSError as e:
+            print(f"Immutable cache disk write error: {e}")
+            return
+        if self._disk_bytes is None:
+            self._disk_bytes = self._disk_usage()
+        else:
+            self._disk_bytes += len(encoded.encode()) - existing
+        if self._disk_bytes > settings.immutable_cache_disk_max_bytes:
+            self._disk_evict()
+
+    def _disk_files(self):
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, stat.st_mtime, stat.st_size
+
+    def _disk_usage(self) -> int:
+        return sum(size for _, _, size in self._disk_files())
+
+    def _disk_evict(self):
+        """Delete least recently used files until usage is back under 90% of the limit"""
+        target = settings.immutable_cache_disk_max_bytes * 0.9
+        files = sorted(self._disk_files(), key=lambda item: item[1])
+        total = sum(size for _, _, size in files)
+        for path, _, size in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                total -= size
+        self._disk_bytes = total
+
+# Global instance
+immutable_cache = ImmutableCache()
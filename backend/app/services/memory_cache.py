@@ -0,0 +1,91 @@
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Tuple
+
+# Sentinel so cached falsy values (None, [], {}) still count as hits
+MISSING = object()
+
+class MemoryCache:
+    """Bounded in-process LRU cache with per-entry TTL.
+
+    Values are stored as decoded Python objects and shared between callers,
+    so callers must treat cached values as read-only.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (value, expires_at, size_bytes), ordered from least to most recently used
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        """Return the cached value or MISSING"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl_seconds: float, size: int):
+        """Store a value for ttl_seconds; size is its encoded size in bytes"""
+        if ttl_seconds <= 0 or size > self.max_bytes:
+            self.delete(key)
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, time.monotonic() + ttl_seconds, size)
+        self._bytes += size
+        self._evict()
+
+    def delete(self, key: str):
+        if key in self._entries:
+            self._remove(key)
+
+    def delete_pattern(self, pattern: str):
+        """Delete keys matching a Redis-style glob pattern"""
+        for key in [k for k in self._entries if fnmatchcase(k, pattern)]:
+            self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._bytes
+        }
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        """Drop expired entries first, then least recently used ones until within bounds"""
+        if len(self._entries) <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        now = time.monotonic()
+        for key in [k for k, (_, expires_at, _) in self._entries.items() if expires_at <= now]:
+            self._remove(key)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
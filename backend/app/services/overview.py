@@ -0,0 +1,181 @@
+import asyncio
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.aggregation import OverviewAggregator, fallback_overview
+from app.services.cache import cache_service, get_policy, MISSING
+from app.services.voiceflow_client import voiceflow_client
+from app.services.warehouse import warehouse
+
+def parse_iso(date_str: str) -> datetime:
+    """Parse a normalized ISO-8601 string (with Z suffix) into an aware datetime"""
+    return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+
+def day_iso(day: date) -> str:
+    """Start of a UTC day in the same format normalize_date_format produces"""
+    return f"{day.isoformat()}T00:00:00.000Z"
+
+class OverviewService:
+    """Overview analytics composed from per-project, per-day cached partial aggregates.
+
+    Any day-aligned range is answered by merging cached days and fetching only
+    the missing ones from Voiceflow, so sliding windows and compare periods
+    mostly reuse each other's work.
+    """
+
+    async def get_overview(self, project_id: str, start_date: str, end_date: str) -> Dict[str, Any]:
+        if warehouse.covers(project_id, start_date, end_date):
+            # Synced locally: no upstream calls on the request path
+            aggregate = await warehouse.get_overview_aggregate(project_id, start_date, end_date)
+            return aggregate.to_overview()
+
+        days = self._day_range(start_date, end_date)
+        if days is None:
+            # Not on day boundaries: buckets can't answer it exactly
+            return await voiceflow_client.get_analytics_overview(project_id, start_date, end_date)
+
+        try:
+            aggregate = await self.get_aggregate(project_id, days)
+        except Exception as e:
+            return fallback_overview(e)
+        return aggregate.to_overview()
+
+    async def get_aggregate(self, project_id: str, days: List[date]) -> OverviewAggregator:
+        """Merge the day buckets for `days` (in order) into one aggregate"""
+        buckets, intents = await asyncio.gather(
+            self.get_days(project_id, days),
+            self.get_intents(project_id, days[0], days[-1])
+        )
+        total = OverviewAggregator()
+        for day in days:
+            total.merge(buckets[day])
+        # Buckets cached before intents became range totals may still carry per-day counts
+        total.intents = {}
+        total.add_intents(intents)
+        return total
+
+    async def get_intents(self, project_id: str, first: date, last: date) -> List[Dict[str, Any]]:
+        """Top intents for the days first..last (inclusive) with a single upstream call.
+
+        Voiceflow only reports top-N intents for a whole range, and summing
+        per-day top-N lists under-counts intents that miss the cut on some
+        days, so intents are not kept in the day buckets. The entry shares its
+        key with the /intents endpoint.
+        """
+        start_iso = day_iso(first)
+        end_iso = day_iso(last + timedelta(days=1))
+
+        async def fetch_data():
+            return await voiceflow_client.get_top_intents(project_id, start_iso, end_iso)
+
+        return await cache_service.get_cached_or_fetch(
+            f"intents:{project_id}:{start_iso}:{end_iso}", fetch_data, range_end=end_iso
+        )
+
+    async def get_days(self, project_id: str, days: List[date]) -> Dict[date, OverviewAggregator]:
+        """Return partial aggregates for each day, fetching uncached days from Voiceflow"""
+        buckets: Dict[date, OverviewAggregator] = {}
+        cached = await cache_service.get_many([self._day_key(project_id, day) for day in days])
+        for day in days:
+            value = cached[self._day_key(project_id, day)]
+            if value is not MISSING:
+                buckets[day] = OverviewAggregator.from_dict(value)
+
+        missing = [day for day in days if day not in buckets]
+        if missing:
+            fetched = await asyncio.gather(*[
+                self._fetch_run(project_id, run_start, run_end)
+                for run_start, run_end in self._contiguous_runs(missing)
+            ])
+            to_store = {}
+            for run in fetched:
+                for day, bucket in run.items():
+                    buckets[day] = bucket
+                    to_store[self._day_key(project_id, day)] = (bucket.to_dict(), self._day_ttl(day))
+            await cache_service.set_many(to_store)
+
+        return buckets
+
+    async def _fetch_run(self, project_id: str, first: date, last: date) -> Dict[date, OverviewAggregator]:
+        """Fetch partial aggregates for the contiguous days first..last (inclusive)"""
+        start_iso = day_iso(first)
+        end_iso = day_iso(last + timedelta(days=1))
+        run_days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+        buckets = {day: OverviewAggregator() for day in run_days}
+
+        async def ingest_transcripts():
+            # Consume the full transcript stream as columnar batches, reduced per day.
+            # Short runs usually fit in a page or two, so don't prefetch pages past their end
+            prefetch = min(settings.voiceflow_transcript_prefetch_pages, len(run_days))
+            async for batch in voiceflow_client.iter_transcript_batches(
+                project_id, start_iso, end_iso, prefetch=prefetch
+            ):
+                for day, partial in batch.to_day_aggregators().items():
+                    bucket = self._bucket_for(buckets, day)
+                    if bucket is not None:
+                        bucket.merge(partial)
+
+        interactions, unique_users, _ = await asyncio.gather(
+            voiceflow_client.time_series_interactions(project_id, start_iso, end_iso),
+            voiceflow_client.time_series_unique_users(project_id, start_iso, end_iso),
+            ingest_transcripts()
+        )
+
+        for item in interactions:
+            bucket = self._bucket_for(buckets, item.get("period"))
+            if bucket is not None:
+                bucket.add_interactions((item,))
+
+        for item in unique_users:
+            bucket = self._bucket_for(buckets, item.get("period"))
+            if bucket is not None:
+                bucket.add_unique_users((item,))
+
+        return buckets
+
+    def _day_range(self, start_date: str, end_date: str) -> Optional[List[date]]:
+        """Days covered by the half-open range [start, end), or None if not day-aligned"""
+        try:
+            start = parse_iso(start_date).astimezone(timezone.utc)
+            end = parse_iso(end_date).astimezone(timezone.utc)
+        except ValueError:
+            return None
+        if start.time() != time.min or end.time() != time.min or end <= start:
+            return None
+        return [start.date() + timedelta(days=i) for i in range((end - start).days)]
+
+    def _contiguous_runs(self, days: List[date]) -> List[Tuple[date, date]]:
+        """Group sorted days into (first, last) runs of consecutive days"""
+        runs = []
+        for day in days:
+            if runs and day == runs[-1][1] + timedelta(days=1):
+                runs[-1] = (runs[-1][0], day)
+            else:
+                runs.append((day, day))
+        return runs
+
+    def _bucket_for(self, buckets: Dict[date, OverviewAggregator], timestamp: Optional[str]) -> Optional[OverviewAggregator]:
+        if not timestamp:
+            return None
+        try:
+            return buckets.get(date.fromisoformat(timestamp[:10]))
+        except ValueError:
+            return None
+
+    def _day_prefix(self, day: date) -> str:
+        # Settled days and days that can still change get separate keys (and policies), so a
+        # short-lived bucket is never reused as a settled one. Upstream keeps revising a day
+        # for cache_historical_lag_hours after it ends, so it only settles after that.
+        settles_at = datetime.combine(day + timedelta(days=1), time.min, timezone.utc) + timedelta(
+            hours=settings.cache_historical_lag_hours
+        )
+        return "overview_day" if datetime.now(timezone.utc) >= settles_at else "overview_live"
+
+    def _day_key(self, project_id: str, day: date) -> str:
+        return f"{self._day_prefix(day)}:{project_id}:{day.isoformat()}"
+
+    def _day_ttl(self, day: date) -> float:
+        return get_policy(self._day_prefix(day), range_end=day_iso(day + timedelta(days=1))).hard_ttl
+
+# Global instance
+overview_service = OverviewService()
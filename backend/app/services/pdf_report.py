@@ -0,0 +1,166 @@
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+from reportlab.graphics.charts.linecharts import HorizontalLineChart
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.shapes import Drawing
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from app.core.config import settings
+from app.services.cache import cache_service
+from app.services.timeseries import lttb
+
+# Bump when the layout changes so cached PDFs are not reused across versions
+REPORT_VERSION = 1
+
+# Chart points drawn before LTTB downsampling kicks in
+_CHART_MAX_POINTS = 60
+
+_SENTIMENT_COLORS = {"positive": colors.green, "neutral": colors.grey, "negative": colors.red}
+
+_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
+])
+
+def _interactions_chart(points: List[Dict[str, Any]]) -> Optional[Drawing]:
+    points = lttb(points, _CHART_MAX_POINTS)
+    if len(points) < 2:
+        return None
+    drawing = Drawing(460, 180)
+    chart = HorizontalLineChart()
+    chart.x, chart.y, chart.width, chart.height = 40, 30, 400, 130
+    chart.data = [[point.get("interactions", 0) for point in points]]
+    # Label roughly six evenly spaced points to keep the axis readable
+    step = max(1, len(points) // 6)
+    chart.categoryAxis.categoryNames = [
+        str(point.get("date", ""))[:10] if i % step == 0 else "" for i, point in enumerate(points)
+    ]
+    chart.categoryAxis.labels.fontSize = 7
+    chart.categoryAxis.labels.angle = 30
+    chart.categoryAxis.labels.boxAnchor = "ne"
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.labels.fontSize = 7
+    chart.lines[0].strokeColor = colors.HexColor("#2563eb")
+    drawing.add(chart)
+    return drawing
+
+def _sentiment_chart(distribution: Dict[str, int]) -> Optional[Drawing]:
+    labels = [name for name, count in distribution.items() if count > 0]
+    if not labels:
+        return None
+    drawing = Drawing(200, 140)
+    pie = Pie()
+    pie.x, pie.y, pie.width, pie.height = 30, 10, 120, 120
+    pie.data = [distribution[name] for name in labels]
+    pie.labels = [name.title() for name in labels]
+    for i, name in enumerate(labels):
+        pie.slices[i].fillColor = _SENTIMENT_COLORS.get(name, colors.lightblue)
+    drawing.add(pie)
+    return drawing
+
+def render_report_pdf(data: Dict[str, Any], start: str, end: str) -> bytes:
+    """Build the analytics report PDF from an overview payload.
+
+    CPU-bound; runs in the renderer's process pool, so it only takes plain,
+    picklable arguments and returns the PDF bytes.
+    """
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles = getSampleStyleSheet()
+    story = []
+
+    story.append(Paragraph("AI Helpdesk Analytics Report", styles['Title']))
+    story.append(Spacer(1, 12))
+    story.append(Paragraph(f"Period: {start} to {end}", styles['Normal']))
+    story.append(Spacer(1, 12))
+
+    metrics = data.get("metrics", {})
+    story.append(Paragraph("Key Metrics", styles['Heading2']))
+    metric_rows = [["Metric", "Value"]] + [
+        [key.replace('_', ' ').title(), str(value)] for key, value in metrics.items()
+    ]
+    story.append(Table(metric_rows, colWidths=[220, 120], style=_TABLE_STYLE))
+    story.append(Spacer(1, 12))
+
+    chart = _interactions_chart(data.get("interactions_chart", []))
+    if chart is not None:
+        story.append(Paragraph("Interactions", styles['Heading2']))
+        story.append(chart)
+        story.append(Spacer(1, 12))
+
+    intents = data.get("top_intents", [])
+    if intents:
+        story.append(Paragraph("Top Intents", styles['Heading2']))
+        intent_rows = [["Intent", "Count", "Share"]] + [
+            [str(intent.get("intent", "")), str(intent.get("count", 0)), f"{intent.get('percentage', 0)}%"]
+            for intent in intents
+        ]
+        story.append(Table(intent_rows, colWidths=[260, 80, 80], style=_TABLE_STYLE))
+        story.append(Spacer(1, 12))
+
+    distribution = data.get("sentiment_distribution", {})
+    if distribution:
+        story.append(Paragraph("Sentiment", styles['Heading2']))
+        total = sum(distribution.values()) or 1
+        sentiment_rows = [["Sentiment", "Transcripts", "Share"]] + [
+            [name.title(), str(count), f"{round(count / total * 100, 1)}%"]
+            for name, count in distribution.items()
+        ]
+        pie = _sentiment_chart(distribution)
+        table = Table(sentiment_rows, colWidths=[100, 80, 60], style=_TABLE_STYLE)
+        story.append(Table([[table, pie]]) if pie is not None else table)
+
+    doc.build(story)
+    return buffer.getvalue()
+
+class PdfRenderer:
+    """Renders report PDFs in a process pool, cached by a hash of their inputs.
+
+    reportlab's build is pure CPU; running it in separate processes keeps the
+    event loop (and /overview latency) unaffected while reports render.
+    """
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs an event loop and open sockets is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=max(1, settings.pdf_render_workers),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def render(self, data: Dict[str, Any], start: str, end: str) -> bytes:
+        inputs = json.dumps(
+            {"version": REPORT_VERSION, "data": data, "start": start, "end": end},
+            sort_keys=True, default=str
+        )
+        cache_key = f"export_pdf:{hashlib.sha256(inputs.encode()).hexdigest()}"
+
+        async def fetch_data():
+            loop = asyncio.get_running_loop()
+            pdf = await loop.run_in_executor(self._executor(), render_report_pdf, data, start, end)
+            # Cache values are JSON, so the bytes are stored base64-encoded
+            return base64.b64encode(pdf).decode()
+
+        return base64.b64decode(await cache_service.get_cached_or_fetch(cache_key, fetch_data))
+
+# Global instance
+pdf_renderer = PdfRenderer()
@@ -0,0 +1,34 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one in-flight call.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same result (or exception). A cancelled caller does
+    not cancel the shared call for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._inflight
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,151 @@
+import base64
+import hashlib
+import math
+import random
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch (HyperLogLog with linear counting for small sets).
+
+    Standard error is about 1.04 / sqrt(2 ** precision): ~1.6% at the default
+    precision of 12 (4096 one-byte registers). Sketches of the same precision
+    merge by taking the register-wise maximum, so distinct counts over any
+    union of buckets come from merging their sketches.
+    """
+
+    def __init__(self, precision: int = 12, registers: Optional[bytearray] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = registers if registers is not None else bytearray(self.size)
+
+    def add(self, value: str):
+        h = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[str]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def is_empty(self) -> bool:
+        return not any(self.registers)
+
+    def count(self) -> int:
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small cardinalities: linear counting is much more accurate
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_str(self) -> str:
+        """Compact JSON-safe encoding; sparse sketches compress to a few bytes"""
+        packed = base64.b64encode(zlib.compress(bytes(self.registers))).decode()
+        return f"{self.precision}:{packed}"
+
+    @classmethod
+    def from_str(cls, data: str) -> "HyperLogLog":
+        precision, packed = data.split(":", 1)
+        registers = bytearray(zlib.decompress(base64.b64decode(packed)))
+        sketch = cls(int(precision), registers)
+        if len(registers) != sketch.size:
+            raise ValueError("Corrupt HyperLogLog sketch")
+        return sketch
+
+class KLLSketch:
+    """Mergeable streaming quantile sketch (KLL).
+
+    Values enter level 0; when a level exceeds its capacity it is sorted and
+    every other item (random offset) is promoted one level up with double
+    weight. Level capacities shrink geometrically below the top level, so the
+    sketch keeps O(k) items and rank error is roughly 1.7 / k. Small inputs
+    are kept exactly.
+    """
+
+    _DECAY = 2 / 3
+
+    def __init__(self, k: int = 200, levels: Optional[List[List[float]]] = None, seed: Optional[int] = None):
+        self.k = k
+        self.levels: List[List[float]] = levels if levels is not None else [[]]
+        self._random = random.Random(seed)
+
+    def __len__(self) -> int:
+        """Total weight, i.e. number of values added"""
+        return sum(len(level) << h for h, level in enumerate(self.levels))
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * self._DECAY ** depth)))
+
+    def add(self, value: float):
+        self.levels[0].append(value)
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def update(self, values: Iterable[float]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for h, level in enumerate(other.levels):
+            self.levels[h].extend(level)
+        self._compress()
+        return self
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) >= self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append([])
+                level.sort()
+                # With an odd count one item stays behind so no weight is lost
+                leftover = [level.pop()] if len(level) % 2 else []
+                offset = self._random.randint(0, 1)
+                self.levels[h + 1].extend(level[offset::2])
+                self.levels[h] = leftover
+            h += 1
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        weighted = sorted(
+            (value, 1 << h) for h, level in enumerate(self.levels) for value in level
+        )
+        total = sum(weight for _, weight in weighted)
+        if not total:
+            return [None for _ in qs]
+        results = []
+        for q in qs:
+            target = q * total
+            cumulative = 0
+            for value, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    results.append(value)
+                    break
+            else:
+                results.append(weighted[-1][0])
+        return results
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "levels": [list(level) for level in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KLLSketch":
+        return cls(data.get("k", 200), [list(level) for level in data.get("levels", [[]])] or [[]])
@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+
+GRANULARITIES = ("hour", "day", "week", "month")
+
+_BUCKET_SPANS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "month": timedelta(days=30),
+}
+
+def _parse_period(value: Any) -> Optional[datetime]:
+    """Usage periods come as dates or ISO datetimes; date-only periods count at midnight UTC"""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+def _format_period(moment: datetime) -> str:
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Start of the UTC hour/day/ISO week (Monday)/month containing `moment`"""
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+def auto_granularity(start_date: str, end_date: str) -> str:
+    """Finest granularity that keeps the range within chart_auto_max_buckets"""
+    start, end = _parse_period(start_date), _parse_period(end_date)
+    if start is None or end is None:
+        return "day"
+    span = end - start
+    for granularity in GRANULARITIES:
+        if span / _BUCKET_SPANS[granularity] <= settings.chart_auto_max_buckets:
+            return granularity
+    return "month"
+
+def rebucket(points: List[Dict[str, Any]], granularity: str) -> List[Dict[str, Any]]:
+    """Sum chart points into hour/day/week/month buckets, in time order.
+
+    Buckets finer than the upstream series (e.g. "hour" over daily periods)
+    leave the points at their original resolution; points without a
+    parseable date are dropped.
+    """
+    totals: Dict[datetime, int] = {}
+    for point in points:
+        moment = _parse_period(point.get("date"))
+        if moment is None:
+            continue
+        bucket = bucket_start(moment, granularity)
+        totals[bucket] = totals.get(bucket, 0) + point.get("interactions", 0)
+    return [
+        {"date": _format_period(bucket), "interactions": count}
+        for bucket, count in sorted(totals.items())
+    ]
+
+def lttb(points: List[Dict[str, Any]], threshold: int) -> List[Dict[str, Any]]:
+    """Largest-triangle-three-buckets downsampling to at most `threshold` points.
+
+    Points are ordered by date (unparseable ones dropped). The first and last
+    point are kept; from each of the threshold - 2 interior buckets it keeps
+    the point forming the largest triangle with the previously kept point and
+    the average of the next bucket, which preserves the visual peaks and
+    troughs of the series.
+    """
+    timed = sorted(
+        ((moment.timestamp(), point) for point in points
+         for moment in (_parse_period(point.get("date")),) if moment is not None),
+        key=lambda pair: pair[0]
+    )
+    points = [point for _, point in timed]
+    if threshold >= len(points) or threshold < 3:
+        return points
+
+    xs = [x for x, _ in timed]
+    ys = [point.get("interactions", 0) for point in points]
+    every = (len(points) - 2) / (threshold - 2)
+
+    sampled = [points[0]]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_start = end
+        next_end = min(int((i + 2) * every) + 1, len(points))
+        if next_start >= next_end:
+            # Last interior bucket: the next "bucket" is the final point
+            next_start, next_end = len(points) - 1, len(points)
+        avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
+
+def shape_chart(
+    data: Dict[str, Any],
+    start_date: str,
+    end_date: str,
+    granularity: Optional[str] = None,
+    max_points: Optional[int] = None
+) -> Dict[str, Any]:
+    """Apply the requested granularity and point budget to an overview payload's chart.
+
+    Overviews are cached with the full-resolution chart, so every granularity
+    shares one cache entry; re-bucketing and downsampling happen per response.
+    """
+    if not granularity and not max_points:
+        return data
+    chart = data.get("interactions_chart", [])
+    if granularity:
+        if granularity == "auto":
+            granularity = auto_granularity(start_date, end_date)
+        chart = rebucket(chart, granularity)
+    if max_points:
+        chart = lttb(chart, max_points)
+    return {**data, "interactions_chart": chart}
@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from app.services.aggregation import OverviewAggregator
+
+# Evaluation name -> column for the categorical/text fields
+_TEXT_EVALUATIONS = {
+    "AI course chosen": "course_recommended",
+    "Vraag gebruiker": "user_question",
+    "AI summary": "ai_summary",
+}
+
+class TranscriptBatch:
+    """Columnar batch of processed transcripts.
+
+    Numeric fields live in NumPy arrays with explicit validity masks
+    (duration, sentiment) or a sentinel (resolution: -1 unknown, 0 false,
+    1 true); repeated text fields are pandas Categoricals. Overview totals
+    come from vectorized reductions (to_aggregator / to_day_aggregators) and
+    columnar exports read the arrays directly; paged API responses use
+    transcript_row(), which produces the same values.
+    """
+
+    ROW_FIELDS = (
+        "id", "sessionID", "createdAt", "endedAt", "duration", "sentiment",
+        "resolution", "course_recommended", "user_question", "ai_summary"
+    )
+
+    def __init__(
+        self,
+        ids: Sequence[Optional[str]],
+        session_ids: Sequence[Optional[str]],
+        created_at: Sequence[Optional[str]],
+        ended_at: Sequence[Optional[str]],
+        duration: np.ndarray,
+        duration_valid: np.ndarray,
+        sentiment: np.ndarray,
+        sentiment_valid: np.ndarray,
+        resolution: np.ndarray,
+        course_recommended: pd.Categorical,
+        user_question: pd.Categorical,
+        ai_summary: Sequence[Optional[str]]
+    ):
+        self.ids = np.asarray(ids, dtype=object)
+        self.session_ids = np.asarray(session_ids, dtype=object)
+        self.created_at = np.asarray(created_at, dtype=object)
+        self.ended_at = np.asarray(ended_at, dtype=object)
+        self.duration = duration
+        self.duration_valid = duration_valid
+        self.sentiment = sentiment
+        self.sentiment_valid = sentiment_valid
+        self.resolution = resolution
+        self.course_recommended = course_recommended
+        self.user_question = user_question
+        self.ai_summary = np.asarray(ai_summary, dtype=object)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_raw(cls, transcripts: Iterable[Dict[str, Any]]) -> "TranscriptBatch":
+        """Build a batch straight from raw Voiceflow transcript JSON"""
+        ids, session_ids, created_at, ended_at = [], [], [], []
+        duration, duration_valid = [], []
+        sentiment, sentiment_valid = [], []
+        resolution = []
+        text: Dict[str, List[Optional[str]]] = {column: [] for column in _TEXT_EVALUATIONS.values()}
+
+        for transcript in transcripts:
+            ids.append(transcript.get("id"))
+            session_ids.append(transcript.get("sessionID"))
+            created_at.append(transcript.get("createdAt"))
+            ended_at.append(transcript.get("endedAt"))
+
+            row_duration = None
+            for prop in transcript.get("properties", ()):
+                if prop.get("name") == "duration":
+                    row_duration = _to_int(prop.get("value", 0))
+            duration.append(row_duration or 0)
+            duration_valid.append(row_duration is not None)
+
+            row_sentiment = None
+            row_resolution = -1
+            row_text = dict.fromkeys(text)
+            for evaluation in transcript.get("evaluations", ()):
+                name = evaluation.get("name")
+                if name == "Customer sentiment":
+                    row_sentiment = _to_int(evaluation.get("value", 3))
+                elif name == "Resolution achieved":
+                    row_resolution = 1 if evaluation.get("value") == "true" else 0
+                elif name in _TEXT_EVALUATIONS:
+                    row_text[_TEXT_EVALUATIONS[name]] = evaluation.get("value")
+            sentiment.append(row_sentiment or 0)
+            sentiment_valid.append(row_sentiment is not None)
+            resolution.append(row_resolution)
+            for column, value in row_text.items():
+                text[column].append(value)
+
+        return cls(
+            ids, session_ids, created_at, ended_at,
+            duration=np.asarray(duration, dtype=np.int64),
+            duration_valid=np.asarray(duration_valid, dtype=bool),
+            sentiment=np.asarray(sentiment, dtype=np.int16),
+            sentiment_valid=np.asarray(sentiment_valid, dtype=bool),
+            resolution=np.asarray(resolution, dtype=np.int8),
+            course_recommended=pd.Categorical(text["course_recommended"]),
+            user_question=pd.Categorical(text["user_question"]),
+            ai_summary=text["ai_summary"]
+        )
+
+    def take(self, indices: np.ndarray) -> "TranscriptBatch":
+        """Sub-batch of the rows at `indices`"""
+        return TranscriptBatch(
+            self.ids[indices], self.session_ids[indices], self.created_at[indices], self.ended_at[indices],
+            duration=self.duration[indices],
+            duration_valid=self.duration_valid[indices],
+            sentiment=self.sentiment[indices],
+            sentiment_valid=self.sentiment_valid[indices],
+            resolution=self.resolution[indices],
+            course_recommended=self.course_recommended[indices],
+            user_question=self.user_question[indices],
+            ai_summary=self.ai_summary[indices]
+        )
+
+    def to_aggregator(self) -> OverviewAggregator:
+        """Transcript totals as a mergeable partial aggregate, with vectorized reductions.
+
+        Matches OverviewAggregator.add_transcript: null or unparsable durations
+        and sentiments are skipped (validity masks), missing values were
+        defaulted while parsing, and the sessionID and duration sketches get
+        the same values.
+        """
+        aggregator = OverviewAggregator()
+        aggregator.transcripts = len(self)
+        durations = self.duration[self.duration_valid]
+        aggregator.duration_sum = int(durations.sum())
+        aggregator.duration_count = int(durations.size)
+        scores = self.sentiment[self.sentiment_valid].astype(np.int64)
+        aggregator.sentiment_sum = int(scores.sum())
+        aggregator.sentiment_count = int(scores.size)
+        values, counts = np.unique(scores, return_counts=True)
+        aggregator.sentiment_hist = {str(int(v)): int(c) for v, c in zip(values, counts)}
+        aggregator.resolved = int((self.resolution == 1).sum())
+        # Duplicate sessionIDs don't change an HLL, so each distinct one is hashed once
+        aggregator.users.update(sid for sid in pd.unique(self.session_ids) if sid)
+        aggregator.durations.update(durations.tolist())
+        return aggregator
+
+    def to_day_aggregators(self) -> Dict[str, OverviewAggregator]:
+        """to_aggregator per createdAt day ("YYYY-MM-DD"); rows without a createdAt are dropped"""
+        days = np.array([value[:10] if isinstance(value, str) else "" for value in self.created_at], dtype=object)
+        keys, inverse = np.unique(days, return_inverse=True)
+        return {
+            key: self.take(np.flatnonzero(inverse == i)).to_aggregator()
+            for i, key in enumerate(keys) if key
+        }
+
+def transcript_row(transcript: Dict[str, Any]) -> Dict[str, Any]:
+    """Process one raw Voiceflow transcript into a /transcripts response dict"""
+    processed = {
+        "id": transcript.get("id"),
+        "sessionID": transcript.get("sessionID"),
+        "createdAt": transcript.get("createdAt"),
+        "endedAt": transcript.get("endedAt"),
+        "duration": None,
+        "sentiment": None,
+        "resolution": None,
+        "course_recommended": None,
+        "user_question": None,
+        "ai_summary": None
+    }
+    
+    # Extract properties
+    for prop in transcript.get("properties", ()):
+        if prop.get("name") == "duration":
+            processed["duration"] = _to_int(prop.get("value", 0))
+    
+    # Extract evaluations
+    for evaluation in transcript.get("evaluations", ()):
+        name = evaluation.get("name")
+        if name == "Customer sentiment":
+            processed["sentiment"] = _to_int(evaluation.get("value", 3))
+        elif name == "Resolution achieved":
+            processed["resolution"] = evaluation.get("value") == "true"
+        elif name in _TEXT_EVALUATIONS:
+            processed[_TEXT_EVALUATIONS[name]] = evaluation.get("value")
+    
+    return processed
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,274 @@
+import asyncio
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.core.config import settings
+from app.services.memory_cache import MISSING
+from app.services.transcript_batch import TranscriptBatch, transcript_row
+from app.services.transcript_messages import project_messages, transcript_messages
+from app.services.voiceflow_client import voiceflow_client
+
+class TranscriptChunk(NamedTuple):
+    batch: TranscriptBatch
+    # Chat messages per transcript (same order as the batch), when requested
+    messages: Optional[List[List[Dict[str, Any]]]]
+
+async def _iter_pages(
+    project_id: str,
+    start_date: str,
+    end_date: str,
+    include_messages: bool = False
+) -> AsyncIterator[Tuple[List[Dict[str, Any]], Optional[List[List[Dict[str, Any]]]]]]:
+    """Yield (raw transcripts, messages per transcript or None) in chunks of export_chunk_rows.
+
+    Chunks are produced while the upstream pages are still arriving and only
+    one is held at a time. With include_messages each chunk's messages are
+    read from the same caches as /transcripts/{id}/messages; misses are
+    fetched concurrently but not cached, so a large export doesn't evict
+    the hot dashboard entries or fill Redis.
+    """
+    semaphore = asyncio.Semaphore(settings.export_message_concurrency)
+
+    async def fetch_messages(transcript_id: str) -> List[Dict[str, Any]]:
+        async with semaphore:
+            return await transcript_messages.fetch_uncached(transcript_id)
+
+    async for page in voiceflow_client.iter_transcript_pages(
+        project_id, start_date, end_date, batch_size=settings.export_chunk_rows
+    ):
+        messages = None
+        if include_messages:
+            ids = [transcript.get("id") for transcript in page]
+            # One batched cache read per chunk; only the misses are fetched individually
+            cached = await transcript_messages.get_cached_many(ids, backfill=False)
+            missing = [tid for tid in dict.fromkeys(ids) if cached[tid] is MISSING]
+            for tid, fetched in zip(missing, await asyncio.gather(*[fetch_messages(tid) for tid in missing])):
+                cached[tid] = fetched
+            messages = [project_messages(cached[tid]) for tid in ids]
+        yield page, messages
+
+async def iter_transcript_chunks(
+    project_id: str,
+    start_date: str,
+    end_date: str,
+    include_messages: bool = False
+) -> AsyncIterator[TranscriptChunk]:
+    """Yield every transcript in the range as columnar chunks (see _iter_pages)"""
+    async for page, messages in _iter_pages(project_id, start_date, end_date, include_messages):
+        yield TranscriptChunk(TranscriptBatch.from_raw(page), messages)
+
+async def iter_transcript_records(
+    project_id: str,
+    start_date: str,
+    end_date: str,
+    include_messages: bool = False
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Chunks of /transcripts-style rows; with include_messages each row gets a "messages" list"""
+    async for page, messages in _iter_pages(project_id, start_date, end_date, include_messages):
+        rows = [transcript_row(transcript) for transcript in page]
+        if messages is not None:
+            for row, row_messages in zip(rows, messages):
+                row["messages"] = row_messages
+        yield rows
+
+async def stream_csv(chunks: AsyncIterator[List[Dict[str, Any]]], include_messages: bool = False) -> AsyncIterator[bytes]:
+    """Encode row chunks as CSV, one header then one encoded block per chunk.
+    Messages don't fit a flat row, so they are written as a JSON column."""
+    fields = list(TranscriptBatch.ROW_FIELDS) + (["messages"] if include_messages else [])
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue().encode()
+
+    async for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            if include_messages:
+                row = {**row, "messages": json.dumps(row.get("messages", []), ensure_ascii=False)}
+            writer.writerow(row)
+        yield buffer.getvalue().encode()
+
+async def stream_ndjson(chunks: AsyncIterator[List[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """Encode row chunks as newline-delimited JSON, one object per transcript"""
+    async for rows in chunks:
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode()
+
+# Columnar (Parquet / Arrow IPC) exports
+
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+_TIMESTAMP = pa.timestamp("ms", tz="UTC")
+
+def transcript_schema(include_messages: bool = False) -> pa.Schema:
+    fields = [
+        ("id", pa.string()),
+        ("sessionID", pa.string()),
+        ("createdAt", _TIMESTAMP),
+        ("endedAt", _TIMESTAMP),
+        ("duration", pa.int64()),
+        ("sentiment", pa.int16()),
+        ("resolution", pa.bool_()),
+        ("course_recommended", _CATEGORY),
+        ("user_question", _CATEGORY),
+        ("ai_summary", pa.string()),
+    ]
+    if include_messages:
+        # Message payloads vary by trace type, so they are kept as JSON text
+        fields.append(("messages", pa.string()))
+    return pa.schema(fields)
+
+def _timestamps(values) -> pa.Array:
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), utc=True, errors="coerce", format="ISO8601")
+    return pa.Array.from_pandas(parsed, type=_TIMESTAMP)
+
+def _categories(values: pd.Categorical) -> pa.Array:
+    # from_pandas maps the NaN of missing categories to null
+    return pa.array(values.astype(object), type=pa.string(), from_pandas=True).dictionary_encode().cast(_CATEGORY)
+
+def transcript_record_batch(chunk: TranscriptChunk, schema: pa.Schema) -> pa.RecordBatch:
+    """Typed Arrow columns straight from the batch's arrays and validity masks"""
+    batch = chunk.batch
+    columns = [
+        pa.array(batch.ids, type=pa.string()),
+        pa.array(batch.session_ids, type=pa.string()),
+        _timestamps(batch.created_at),
+        _timestamps(batch.ended_at),
+        pa.array(batch.duration, mask=~batch.duration_valid, type=pa.int64()),
+        pa.array(batch.sentiment, mask=~batch.sentiment_valid, type=pa.int16()),
+        pa.array(batch.resolution == 1, mask=batch.resolution < 0, type=pa.bool_()),
+        _categories(batch.course_recommended),
+        _categories(batch.user_question),
+        pa.array(batch.ai_summary, type=pa.string()),
+    ]
+    if "messages" in schema.names:
+        columns.append(pa.array(
+            [json.dumps(messages, ensure_ascii=False) for messages in chunk.messages or [[]] * len(batch)],
+            type=pa.string()
+        ))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+def metrics_table(data: Dict[str, Any], start_date: str, end_date: str) -> pa.Table:
+    """One typed row of overview metrics for the period"""
+    metrics = data.get("metrics", {})
+    return pa.table({
+        "period_start": _timestamps([start_date]),
+        "period_end": _timestamps([end_date]),
+        "total_interactions": pa.array([metrics.get("total_interactions")], type=pa.int64()),
+        "unique_users": pa.array([metrics.get("unique_users")], type=pa.int64()),
+        "avg_session_duration": pa.array([metrics.get("avg_session_duration")], type=pa.float64()),
+        "completion_rate": pa.array([metrics.get("completion_rate")], type=pa.float64()),
+        "satisfaction_score": pa.array([metrics.get("satisfaction_score")], type=pa.float64()),
+    })
+
+class _ChunkSink:
+    """Write-only file object whose contents are drained after each write,
+    so encoded bytes go out to the response instead of piling up in memory"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+class _ParquetEncoder:
+    def __init__(self, sink: _ChunkSink, schema: pa.Schema):
+        self._writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression=settings.export_compression)
+
+    def write(self, table: pa.Table):
+        self._writer.write_table(table, row_group_size=table.num_rows)
+
+    def close(self):
+        self._writer.close()
+
+class _ArrowEncoder:
+    def __init__(self, sink: _ChunkSink, schema: pa.Schema):
+        options = pa.ipc.IpcWriteOptions(compression=settings.export_compression)
+        self._writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema, options=options)
+
+    def write(self, table: pa.Table):
+        self._writer.write_table(table)
+
+    def close(self):
+        self._writer.close()
+
+_ENCODERS = {"parquet": _ParquetEncoder, "arrow": _ArrowEncoder}
+
+async def stream_columnar(
+    chunks: AsyncIterator[TranscriptChunk],
+    export_format: str,
+    include_messages: bool = False
+) -> AsyncIterator[bytes]:
+    """Encode transcript chunks as Parquet or an Arrow IPC stream.
+
+    Record batches are buffered into row groups (Parquet) or batch runs
+    (Arrow) and encoded in a thread; the bytes are yielded as soon as they're
+    written. The first row group is a single chunk and each one after that
+    doubles, up to export_row_group_rows, so the response starts right away
+    while most of the file still gets large row groups.
+    """
+    schema = transcript_schema(include_messages)
+    sink = _ChunkSink()
+    encoder = _ENCODERS[export_format](sink, schema)
+    pending: List[pa.RecordBatch] = []
+    pending_rows = 0
+    pending_bytes = 0
+    row_group_rows = max(1, min(settings.export_chunk_rows, settings.export_row_group_rows))
+
+    async def flush():
+        nonlocal pending_rows, pending_bytes
+        table = pa.Table.from_batches(pending, schema=schema)
+        pending.clear()
+        pending_rows = 0
+        pending_bytes = 0
+        await asyncio.to_thread(encoder.write, table)
+
+    try:
+        # Parquet's leading magic bytes are written on open
+        header = sink.drain()
+        if header:
+            yield header
+        async for chunk in chunks:
+            batch = transcript_record_batch(chunk, schema)
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            pending_bytes += batch.nbytes
+            if pending_rows >= row_group_rows or pending_bytes >= settings.export_row_group_bytes:
+                await flush()
+                row_group_rows = min(row_group_rows * 2, settings.export_row_group_rows)
+                yield sink.drain()
+        if pending:
+            await flush()
+    finally:
+        encoder.close()
+    yield sink.drain()
+
+def encode_table(table: pa.Table, export_format: str) -> bytes:
+    """Encode a small in-memory table (e.g. the metrics summary) in one go"""
+    sink = _ChunkSink()
+    encoder = _ENCODERS[export_format](sink, table.schema)
+    encoder.write(table)
+    encoder.close()
+    return sink.drain()
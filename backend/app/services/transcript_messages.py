@@ -0,0 +1,109 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.services.cache import cache_service, get_policy
+from app.services.immutable_cache import immutable_cache
+from app.services.memory_cache import MISSING
+from app.services.singleflight import SingleFlight
+from app.services.voiceflow_client import CHAT_MESSAGE_FIELDS, voiceflow_client
+
+def project_messages(messages: List[Dict[str, Any]], fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Keep only `fields` of each message (default: the slim CHAT_MESSAGE_FIELDS)"""
+    fields = fields or CHAT_MESSAGE_FIELDS
+    return [{name: message[name] for name in fields if name in message} for message in messages]
+
+def message_fields(include_raw: bool = False, fields: Optional[str] = None) -> Tuple[bool, Tuple[str, ...]]:
+    """Resolve the include_raw / comma-separated `fields` request options into
+    (needs raw variant, fields to return); raises ValueError on unknown fields"""
+    if fields:
+        selected = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        unknown = [name for name in selected if name not in CHAT_MESSAGE_FIELDS + ("raw_data",)]
+        if unknown or not selected:
+            raise ValueError(f"Unknown message fields: {', '.join(unknown) or fields}")
+    else:
+        selected = CHAT_MESSAGE_FIELDS + (("raw_data",) if include_raw else ())
+    return "raw_data" in selected, selected
+
+class TranscriptMessageService:
+    """Chat messages per transcript, cached by whether the conversation can still change.
+
+    Finished transcripts (endedAt set) are stored once in the immutable tier
+    and never fetched again; in-progress ones use the short-lived
+    transcript_messages policy so new messages show up. Slim messages and
+    the rarely requested raw variant are cached under separate keys.
+    """
+
+    def __init__(self):
+        # Concurrent first reads of a transcript share one fetch
+        self._inflight = SingleFlight()
+
+    def _final_key(self, transcript_id: str, include_raw: bool = False) -> str:
+        return f"transcript_final{'_raw' if include_raw else ''}:{transcript_id}"
+
+    def _live_key(self, transcript_id: str, include_raw: bool = False) -> str:
+        return f"transcript_messages{'_raw' if include_raw else ''}:{transcript_id}"
+
+    async def get(self, transcript_id: str, include_raw: bool = False) -> List[Dict[str, Any]]:
+        final_key = self._final_key(transcript_id, include_raw)
+        messages = await immutable_cache.get(final_key)
+        if messages is not MISSING:
+            return messages
+
+        live_key = self._live_key(transcript_id, include_raw)
+        if await cache_service.get(live_key) is MISSING:
+            # Not known to be in progress: fetch once to find out which tier it belongs in,
+            # so finished transcripts never take up space in the short-lived tier
+            return await self._inflight.do(live_key, lambda: self._fetch_into_tier(transcript_id, include_raw))
+
+        async def fetch_data():
+            full_transcript = await voiceflow_client.get_transcript_with_logs(transcript_id)
+            messages = voiceflow_client.parse_chat_messages(full_transcript, include_raw)
+            if voiceflow_client.is_transcript_finished(full_transcript):
+                # Finished since it was last cached; later reads are served from the immutable tier
+                await immutable_cache.set(final_key, messages)
+            return messages
+
+        return await cache_service.get_cached_or_fetch(live_key, fetch_data)
+
+    async def _fetch_into_tier(self, transcript_id: str, include_raw: bool) -> List[Dict[str, Any]]:
+        """Fetch messages and cache them in the immutable tier if finished, else in the live tier"""
+        full_transcript = await voiceflow_client.get_transcript_with_logs(transcript_id)
+        messages = voiceflow_client.parse_chat_messages(full_transcript, include_raw)
+        if voiceflow_client.is_transcript_finished(full_transcript):
+            await immutable_cache.set(self._final_key(transcript_id, include_raw), messages)
+        else:
+            live_key = self._live_key(transcript_id, include_raw)
+            await cache_service.set(live_key, messages, get_policy(live_key).hard_ttl)
+        return messages
+
+    async def fetch_uncached(self, transcript_id: str, include_raw: bool = False) -> List[Dict[str, Any]]:
+        """Fetch and parse messages without storing them in any cache tier.
+        For bulk reads (exports) that would otherwise evict the hot entries."""
+        full_transcript = await voiceflow_client.get_transcript_with_logs(transcript_id)
+        return voiceflow_client.parse_chat_messages(full_transcript, include_raw)
+
+    async def get_cached(self, transcript_id: str, include_raw: bool = False) -> Any:
+        """Cached messages from either tier without fetching, or MISSING"""
+        messages = await immutable_cache.get(self._final_key(transcript_id, include_raw))
+        if messages is MISSING:
+            messages = await cache_service.get(self._live_key(transcript_id, include_raw))
+        return messages
+
+    async def get_cached_many(
+        self,
+        transcript_ids: List[str],
+        include_raw: bool = False,
+        backfill: bool = True
+    ) -> Dict[str, Any]:
+        """get_cached for many transcripts with one batched read per tier;
+        backfill=False reads without copying hits into the in-process tiers"""
+        final_keys = {tid: self._final_key(tid, include_raw) for tid in transcript_ids}
+        final = await immutable_cache.get_many(final_keys.values(), backfill)
+        messages = {tid: final[key] for tid, key in final_keys.items()}
+
+        live_keys = {tid: self._live_key(tid, include_raw) for tid, value in messages.items() if value is MISSING}
+        if live_keys:
+            live = await cache_service.get_many(live_keys.values(), backfill)
+            messages.update({tid: live[key] for tid, key in live_keys.items()})
+        return messages
+
+# Global instance
+transcript_messages = TranscriptMessageService()
@@ -1,7 +1,16 @@
 import httpx
 import asyncio
-from typing import Dict, Any, List, Optional, Iterable
+import json
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, AsyncIterator, Deque, Iterator, List, Optional, Iterable, Tuple
 from app.core.config import settings
+from app.services.aggregation import OverviewAggregator, fallback_overview
+from app.services.singleflight import SingleFlight
+from app.services.transcript_batch import TranscriptBatch, transcript_row
+
+# Fields of a chat message; raw_data (the full log payload) is opt-in
+CHAT_MESSAGE_FIELDS = ("type", "role", "text", "timestamp")
 
 class VFError(Exception):
     pass
@@ -14,20 +23,68 @@ class VoiceflowClient:
             "Authorization": self.api_key,
             "Content-Type": "application/json"
         }
+        self._client: Optional[httpx.AsyncClient] = None
+        # Identical concurrent upstream requests share one HTTP call
+        self._inflight = SingleFlight()
+    
+    def _create_client(self) -> httpx.AsyncClient:
+        """Create the shared pooled HTTP client"""
+        limits = httpx.Limits(
+            max_connections=settings.voiceflow_max_connections,
+            max_keepalive_connections=settings.voiceflow_max_keepalive_connections,
+            keepalive_expiry=settings.voiceflow_keepalive_expiry
+        )
+        timeout = httpx.Timeout(
+            settings.voiceflow_timeout,
+            connect=settings.voiceflow_connect_timeout,
+            pool=settings.voiceflow_pool_timeout
+        )
+        http2 = settings.voiceflow_http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("HTTP/2 requested but 'h2' is not installed, falling back to HTTP/1.1")
+                http2 = False
+        return httpx.AsyncClient(
+            headers=self.headers, limits=limits, timeout=timeout, http2=http2
+        )
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared HTTP client, created lazily if startup() was not called"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+        return self._client
+    
+    async def startup(self):
+        """Open the shared HTTP client (called from the app lifespan)"""
+        _ = self.client
+    
+    async def close(self):
+        """Close the shared HTTP client and its pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def _request(self, method: str, url: str, **kwargs) -> Any:
-        """Make request with retry logic"""
+        """Make request with retry logic, coalescing identical in-flight requests"""
+        key = json.dumps(
+            [method, url, kwargs.get("params"), kwargs.get("json")],
+            sort_keys=True, default=str
+        )
+        return await self._inflight.do(key, lambda: self._send(method, url, **kwargs))
+    
+    async def _send(self, method: str, url: str, **kwargs) -> Any:
+        """Send a request, retrying on 5xx responses"""
         for attempt in range(3):
-            async with httpx.AsyncClient() as client:
-                response = await client.request(
-                    method, url, headers=self.headers, timeout=30, **kwargs
-                )
-                if response.status_code >= 500 and attempt < 2:
-                    await asyncio.sleep(0.8 * (attempt + 1))
-                    continue
-                if response.status_code >= 400:
-                    raise VFError(f"{response.status_code} {response.text}")
-                return response.json() if response.content else None
+            response = await self.client.request(method, url, **kwargs)
+            if response.status_code >= 500 and attempt < 2:
+                await asyncio.sleep(0.8 * (attempt + 1))
+                continue
+            if response.status_code >= 400:
+                raise VFError(f"{response.status_code} {response.text}")
+            return response.json() if response.content else None
     
     async def list_transcripts(
         self, 
@@ -61,18 +118,113 @@ class VoiceflowClient:
         items = data.get("transcripts", []) or data.get("items", [])
         return items
     
+    async def iter_transcripts(
+        self, 
+        project_id: str, 
+        start_iso: Optional[str] = None, 
+        end_iso: Optional[str] = None,
+        order: str = "ASC",
+        page_size: Optional[int] = None,
+        prefetch: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream every transcript in a date range.
+        
+        Up to `prefetch` take/skip pages are requested concurrently; a new page
+        is only requested once the consumer has drained the oldest one, so
+        memory stays bounded by prefetch * page_size. ASC order keeps skip
+        offsets stable while new transcripts arrive.
+        """
+        page_size = page_size or settings.voiceflow_transcript_page_size
+        prefetch = max(1, prefetch or settings.voiceflow_transcript_prefetch_pages)
+        pending: Deque[asyncio.Task] = deque()
+        next_skip = 0
+        
+        def schedule():
+            nonlocal next_skip
+            pending.append(asyncio.ensure_future(
+                self.list_transcripts(project_id, start_iso, end_iso, page_size, next_skip, order)
+            ))
+            next_skip += page_size
+        
+        for _ in range(prefetch):
+            schedule()
+        try:
+            while pending:
+                page = await pending.popleft()
+                for transcript in page:
+                    yield transcript
+                if len(page) < page_size:
+                    # Last page reached; anything prefetched beyond it is empty
+                    break
+                schedule()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    async def iter_transcript_pages(
+        self, 
+        project_id: str, 
+        start_iso: Optional[str] = None, 
+        end_iso: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        prefetch: Optional[int] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream a range as lists of up to `batch_size` raw transcripts"""
+        batch_size = batch_size or settings.voiceflow_transcript_page_size
+        page: List[Dict[str, Any]] = []
+        async for transcript in self.iter_transcripts(project_id, start_iso, end_iso, prefetch=prefetch):
+            page.append(transcript)
+            if len(page) >= batch_size:
+                yield page
+                page = []
+        if page:
+            yield page
+    
+    async def iter_transcript_batches(
+        self, 
+        project_id: str, 
+        start_iso: Optional[str] = None, 
+        end_iso: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        prefetch: Optional[int] = None
+    ) -> AsyncIterator[TranscriptBatch]:
+        """Stream a range as columnar batches of up to `batch_size` transcripts"""
+        async for page in self.iter_transcript_pages(project_id, start_iso, end_iso, batch_size, prefetch):
+            yield TranscriptBatch.from_raw(page)
+    
     async def get_transcript_with_logs(self, transcript_id: str) -> Dict[str, Any]:
         """Get full transcript with logs"""
         url = f"{self.base_url}/v1/transcript/{transcript_id}"
         return await self._request("GET", url)
     
-    async def get_chat_messages(self, transcript_id: str) -> List[Dict[str, Any]]:
+    async def get_chat_messages(self, transcript_id: str, include_raw: bool = False) -> List[Dict[str, Any]]:
         """Get chat messages from a transcript"""
         full_transcript = await self.get_transcript_with_logs(transcript_id)
+        return self.parse_chat_messages(full_transcript, include_raw)
+    
+    @staticmethod
+    def is_transcript_finished(full_transcript: Dict[str, Any]) -> bool:
+        """True once the conversation has ended (endedAt set); its logs can no longer change"""
+        transcript_data = full_transcript.get('transcript', {})
+        return bool(transcript_data.get('endedAt') or full_transcript.get('endedAt'))
+    
+    @classmethod
+    def parse_chat_messages(cls, full_transcript: Dict[str, Any], include_raw: bool = False) -> List[Dict[str, Any]]:
+        """Extract user/assistant chat messages from a transcript with logs"""
+        return list(cls.iter_chat_messages(full_transcript, include_raw))
+    
+    @staticmethod
+    def iter_chat_messages(full_transcript: Dict[str, Any], include_raw: bool = False) -> Iterator[Dict[str, Any]]:
+        """Yield chat messages one log entry at a time.
+        
+        Messages carry only type/role/text/timestamp (CHAT_MESSAGE_FIELDS); the
+        full log payload, usually several times larger than the text, is only
+        attached as raw_data when include_raw is set.
+        """
         transcript_data = full_transcript.get('transcript', {})
         logs = transcript_data.get('logs', [])
         
-        messages = []
         for log in logs:
             message_data = log.get('data', {})
             message_type = log.get('type', 'unknown')
@@ -107,15 +259,15 @@ class VoiceflowClient:
                         continue
             
             if text and role in ['user', 'assistant']:
-                messages.append({
+                message = {
                     'type': message_type,
                     'role': role,
                     'text': text,
-                    'timestamp': log.get('createdAt'),
-                    'raw_data': message_data
-                })
-        
-        return messages
+                    'timestamp': log.get('createdAt')
+                }
+                if include_raw:
+                    message['raw_data'] = message_data
+                yield message
     
     async def get_transcript_analytics(
         self, 
@@ -148,42 +300,7 @@ class VoiceflowClient:
         raw_transcripts = data.get("transcripts", []) or data.get("items", [])
         
         # Process transcripts for dashboard display (same as get_transcripts)
-        processed_transcripts = []
-        for transcript in raw_transcripts:
-            processed = {
-                "id": transcript.get("id"),
-                "sessionID": transcript.get("sessionID"),
-                "createdAt": transcript.get("createdAt"),
-                "endedAt": transcript.get("endedAt"),
-                "duration": None,
-                "sentiment": None,
-                "resolution": None,
-                "course_recommended": None,
-                "user_question": None,
-                "ai_summary": None
-            }
-            
-            # Extract properties
-            for prop in transcript.get("properties", []):
-                if prop.get("name") == "duration":
-                    processed["duration"] = int(prop.get("value", 0))
-            
-            # Extract evaluations
-            for eval in transcript.get("evaluations", []):
-                if eval.get("name") == "Customer sentiment":
-                    processed["sentiment"] = int(eval.get("value", 3))
-                elif eval.get("name") == "Resolution achieved":
-                    processed["resolution"] = eval.get("value") == "true"
-                elif eval.get("name") == "AI course chosen":
-                    processed["course_recommended"] = eval.get("value")
-                elif eval.get("name") == "Vraag gebruiker":
-                    processed["user_question"] = eval.get("value")
-                elif eval.get("name") == "AI summary":
-                    processed["ai_summary"] = eval.get("value")
-            
-            processed_transcripts.append(processed)
-        
-        return processed_transcripts
+        return [transcript_row(transcript) for transcript in raw_transcripts]
     
     async def query_usage_v2(
         self, 
@@ -209,29 +326,101 @@ class VoiceflowClient:
         body = {"data": {"name": name, "filter": filt}}
         return await self._request("POST", url, json=body)
     
-    async def time_series_interactions(
+    async def iter_usage_pages(
         self, 
+        name: str, 
         project_id: str, 
         start_iso: Optional[str] = None,
-        end_iso: Optional[str] = None
-    ) -> List[Dict[str, Any]]:
-        """Get time series interactions data"""
-        all_items = []
+        end_iso: Optional[str] = None, 
+        limit: Optional[int] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield pages of a v2 usage query in order by following its cursor"""
         cursor = None
         
         while True:
-            res = await self.query_usage_v2(
-                "interactions", project_id, start_iso, end_iso, cursor=cursor
-            )
+            res = await self.query_usage_v2(name, project_id, start_iso, end_iso, limit, cursor)
             result = res.get("result", {})
-            items = result.get("items", [])
-            all_items.extend(items)
+            yield result.get("items", [])
             
             cursor = result.get("cursor")
             if not cursor: 
                 break
-                
-        return all_items
+    
+    async def iter_usage_items(
+        self, 
+        name: str, 
+        project_id: str, 
+        start_iso: Optional[str] = None,
+        end_iso: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield items of a v2 usage query in time order.
+        
+        Long ranges are split into day-aligned sub-windows whose cursors are
+        walked concurrently (bounded by a semaphore); items are still yielded
+        in window order, each window as soon as it and its predecessors finish.
+        """
+        windows = self._split_usage_windows(start_iso, end_iso)
+        if len(windows) == 1:
+            async for page in self.iter_usage_pages(name, project_id, start_iso, end_iso):
+                for item in page:
+                    yield item
+            return
+        
+        semaphore = asyncio.Semaphore(settings.voiceflow_usage_concurrency)
+        
+        async def collect(window_start: str, window_end: str) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return [
+                    item
+                    async for page in self.iter_usage_pages(name, project_id, window_start, window_end)
+                    for item in page
+                ]
+        
+        tasks = [asyncio.ensure_future(collect(ws, we)) for ws, we in windows]
+        try:
+            for task in tasks:
+                for item in await task:
+                    yield item
+        finally:
+            # Consumer stopped early or a window failed: don't leave fetches running
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def _split_usage_windows(
+        self, 
+        start_iso: Optional[str], 
+        end_iso: Optional[str]
+    ) -> List[Tuple[Optional[str], Optional[str]]]:
+        """Split [start, end) into windows of voiceflow_usage_window_days with interior
+        boundaries on UTC midnight, so daily periods never straddle two windows"""
+        if not start_iso or not end_iso:
+            return [(start_iso, end_iso)]
+        try:
+            start = datetime.fromisoformat(start_iso.replace('Z', '+00:00')).astimezone(timezone.utc)
+            end = datetime.fromisoformat(end_iso.replace('Z', '+00:00')).astimezone(timezone.utc)
+        except ValueError:
+            return [(start_iso, end_iso)]
+        
+        window = timedelta(days=max(1, settings.voiceflow_usage_window_days))
+        boundaries = [start_iso]
+        boundary = datetime.combine(start.date(), datetime.min.time(), tzinfo=timezone.utc) + window
+        while boundary < end:
+            boundaries.append(f"{boundary.date().isoformat()}T00:00:00.000Z")
+            boundary += window
+        boundaries.append(end_iso)
+        return list(zip(boundaries[:-1], boundaries[1:]))
+    
+    async def time_series_interactions(
+        self, 
+        project_id: str, 
+        start_iso: Optional[str] = None,
+        end_iso: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get time series interactions data"""
+        return [
+            item async for item in self.iter_usage_items("interactions", project_id, start_iso, end_iso)
+        ]
     
     async def time_series_unique_users(
         self, 
@@ -240,22 +429,9 @@ class VoiceflowClient:
         end_iso: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Get time series unique users data"""
-        all_items = []
-        cursor = None
-        
-        while True:
-            res = await self.query_usage_v2(
-                "unique_users", project_id, start_iso, end_iso, cursor=cursor
-            )
-            result = res.get("result", {})
-            items = result.get("items", [])
-            all_items.extend(items)
-            
-            cursor = result.get("cursor")
-            if not cursor: 
-                break
-                
-        return all_items
+        return [
+            item async for item in self.iter_usage_items("unique_users", project_id, start_iso, end_iso)
+        ]
     
     async def top_intents(
         self, 
@@ -282,115 +458,29 @@ class VoiceflowClient:
     ) -> Dict[str, Any]:
         """Get overview analytics for dashboard"""
         try:
+            aggregate = OverviewAggregator()
+            
+            async def ingest_transcripts():
+                # Stream the range as columnar batches and merge their vectorized totals
+                async for batch in self.iter_transcript_batches(project_id, start_date, end_date):
+                    aggregate.merge(batch.to_aggregator())
+            
             # Get all data in parallel
-            interactions, unique_users, intents, transcripts = await asyncio.gather(
+            interactions, unique_users, intents, _ = await asyncio.gather(
                 self.time_series_interactions(project_id, start_date, end_date),
                 self.time_series_unique_users(project_id, start_date, end_date),
                 self.top_intents(project_id, start_date, end_date, limit=10),
-                self.list_transcripts(project_id, start_date, end_date, limit=100)
+                ingest_transcripts()
             )
             
-            # Calculate metrics from real data
-            total_interactions = sum(item.get("count", 0) for item in interactions)
-            total_unique_users = sum(item.get("count", 0) for item in unique_users)
-            
-            # Calculate real metrics from transcripts
-            if transcripts:
-                # Calculate average session duration from transcript properties
-                durations = []
-                sentiment_scores = []
-                resolution_count = 0
-                
-                for transcript in transcripts:
-                    properties = transcript.get("properties", [])
-                    evaluations = transcript.get("evaluations", [])
-                    
-                    # Get duration
-                    for prop in properties:
-                        if prop.get("name") == "duration":
-                            duration_val = prop.get("value", "0")
-                            try:
-                                durations.append(int(duration_val))
-                            except:
-                                pass
-                    
-                    # Get sentiment and resolution from evaluations
-                    for eval in evaluations:
-                        if eval.get("name") == "Customer sentiment":
-                            sentiment_val = eval.get("value", "3")
-                            try:
-                                sentiment_scores.append(int(sentiment_val))
-                            except:
-                                pass
-                        elif eval.get("name") == "Resolution achieved":
-                            if eval.get("value") == "true":
-                                resolution_count += 1
-                
-                avg_session_duration = sum(durations) / len(durations) if durations else 180.5
-                avg_sentiment = sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 3.0
-                completion_rate = resolution_count / len(transcripts) if transcripts else 0.75
-            else:
-                # Fallback values if no transcripts
-                avg_session_duration = 180.5
-                avg_sentiment = 3.0
-                completion_rate = 0.75
-            
-            # Calculate sentiment distribution
-            if transcripts:
-                positive = sum(1 for t in transcripts 
-                             for e in t.get("evaluations", [])
-                             if e.get("name") == "Customer sentiment" and int(e.get("value", "3")) >= 4)
-                negative = sum(1 for t in transcripts 
-                             for e in t.get("evaluations", [])
-                             if e.get("name") == "Customer sentiment" and int(e.get("value", "3")) <= 2)
-                neutral = len(transcripts) - positive - negative
-                
-                sentiment_dist = {
-                    "positive": positive,
-                    "neutral": neutral,
-                    "negative": negative
-                }
-            else:
-                sentiment_dist = {"positive": 60, "neutral": 30, "negative": 10}
-            
-            return {
-                "metrics": {
-                    "total_interactions": total_interactions,
-                    "unique_users": total_unique_users,
-                    "avg_session_duration": round(avg_session_duration, 1),
-                    "completion_rate": round(completion_rate, 2),
-                    "satisfaction_score": round(avg_sentiment, 1)
-                },
-                "interactions_chart": [
-                    {"date": item.get("period", ""), "interactions": item.get("count", 0)}
-                    for item in interactions  # Show all interactions data
-                ],
-                "top_intents": [
-                    {
-                        "intent": intent.get("name", ""),
-                        "count": intent.get("count", 0),
-                        "percentage": round(intent.get("count", 0) / total_interactions * 100, 1) if total_interactions > 0 else 0
-                    }
-                    for intent in intents
-                ],
-                "sentiment_distribution": sentiment_dist
-            }
+            aggregate.add_interactions(interactions)
+            aggregate.add_unique_users(unique_users)
+            aggregate.add_intents(intents)
+            return aggregate.to_overview()
             
         except Exception as e:
             # Fallback to mock data if API fails
-            return {
-                "metrics": {
-                    "total_interactions": 0,
-                    "unique_users": 0,
-                    "avg_session_duration": 180.5,
-                    "completion_rate": 0.75,
-                    "satisfaction_score": 4.2
-                },
-                "interactions_chart": [],
-                "top_intents": [],
-                "sentiment_distribution": {"positive": 60, "neutral": 30, "negative": 10},
-                "error": str(e)
-            }
+            return fallback_overview(e)
     
     async def get_transcripts(
         self, 
@@ -405,42 +495,7 @@ class VoiceflowClient:
         transcripts = await self.list_transcripts(project_id, start_date, end_date, limit, skip, order)
         
         # Process transcripts for dashboard display
-        processed_transcripts = []
-        for transcript in transcripts:
-            processed = {
-                "id": transcript.get("id"),
-                "sessionID": transcript.get("sessionID"),
-                "createdAt": transcript.get("createdAt"),
-                "endedAt": transcript.get("endedAt"),
-                "duration": None,
-                "sentiment": None,
-                "resolution": None,
-                "course_recommended": None,
-                "user_question": None,
-                "ai_summary": None
-            }
-            
-            # Extract properties
-            for prop in transcript.get("properties", []):
-                if prop.get("name") == "duration":
-                    processed["duration"] = int(prop.get("value", 0))
-            
-            # Extract evaluations
-            for eval in transcript.get("evaluations", []):
-                if eval.get("name") == "Customer sentiment":
-                    processed["sentiment"] = int(eval.get("value", 3))
-                elif eval.get("name") == "Resolution achieved":
-                    processed["resolution"] = eval.get("value") == "true"
-                elif eval.get("name") == "AI course chosen":
-                    processed["course_recommended"] = eval.get("value")
-                elif eval.get("name") == "Vraag gebruiker":
-                    processed["user_question"] = eval.get("value")
-                elif eval.get("name") == "AI summary":
-                    processed["ai_summary"] = eval.get("value")
-            
-            processed_transcripts.append(processed)
-        
-        return processed_transcripts
+        return [transcript_row(transcript) for transcript in transcripts]
     
     async def get_top_intents(
         self, 
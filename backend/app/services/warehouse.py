@@ -0,0 +1,704 @@
+import asyncio
+import json
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.aggregation import OverviewAggregator
+from app.services.database import Database
+from app.services.transcript_batch import TranscriptBatch, transcript_row
+from app.services.voiceflow_client import voiceflow_client
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS transcripts (
+        id TEXT PRIMARY KEY,
+        project_id TEXT NOT NULL,
+        session_id TEXT,
+        created_at TEXT NOT NULL,
+        ended_at TEXT,
+        duration INTEGER,
+        sentiment INTEGER,
+        resolution INTEGER,
+        course_recommended TEXT,
+        user_question TEXT,
+        ai_summary TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_transcripts_project_created ON transcripts (project_id, created_at)",
+    """
+    CREATE TABLE IF NOT EXISTS transcript_evaluations (
+        transcript_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        value TEXT,
+        PRIMARY KEY (transcript_id, name)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS transcript_properties (
+        transcript_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        value TEXT,
+        PRIMARY KEY (transcript_id, name)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS usage_series (
+        project_id TEXT NOT NULL,
+        metric TEXT NOT NULL,
+        period TEXT NOT NULL,
+        day TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (project_id, metric, period)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_usage_series_project_day ON usage_series (project_id, metric, day)",
+    """
+    CREATE TABLE IF NOT EXISTS intents_daily (
+        project_id TEXT NOT NULL,
+        day TEXT NOT NULL,
+        name TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (project_id, day, name)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rollups (
+        project_id TEXT NOT NULL,
+        granularity TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        state TEXT NOT NULL,
+        PRIMARY KEY (project_id, granularity, bucket)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sync_state (
+        project_id TEXT PRIMARY KEY,
+        watermark TEXT,
+        last_synced_at TEXT,
+        synced_from TEXT,
+        synced_until TEXT
+    )
+    """,
+]
+
+# Stores created before sync_state.synced_from / synced_until existed
+MIGRATIONS = [
+    "ALTER TABLE sync_state ADD COLUMN synced_from TEXT",
+    "ALTER TABLE sync_state ADD COLUMN synced_until TEXT",
+]
+
+def to_utc_iso(value: str) -> str:
+    """Normalize an ISO-8601 timestamp to UTC 'YYYY-MM-DDTHH:MM:SS.mmmZ' so it sorts as a string"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+def _end_day_exclusive(end_iso: str) -> str:
+    """First day not covered by a range ending at end_iso (exclusive)"""
+    end = datetime.fromisoformat(to_utc_iso(end_iso).replace('Z', '+00:00'))
+    day = end.date()
+    if end.time() != datetime.min.time():
+        day += timedelta(days=1)
+    return day.isoformat()
+
+def _parse_utc(value: str) -> datetime:
+    return datetime.fromisoformat(to_utc_iso(value).replace('Z', '+00:00'))
+
+def _hour_key(moment: datetime) -> str:
+    return moment.strftime('%Y-%m-%dT%H')
+
+def _period_hour(period: str) -> str:
+    """Hour bucket of a usage period; date-only periods count at midnight"""
+    return f"{period}T00" if len(period) == 10 else to_utc_iso(period)[:13]
+
+def _next_month(moment: datetime) -> datetime:
+    if moment.month == 12:
+        return moment.replace(year=moment.year + 1, month=1, day=1)
+    return moment.replace(month=moment.month + 1, day=1)
+
+def plan_rollup_segments(start: datetime, end: datetime) -> Optional[List[Tuple[str, str, str]]]:
+    """Cover [start, end) with the coarsest rollup buckets that fit exactly.
+
+    Returns (granularity, first_bucket, end_bucket_exclusive) segments, e.g. a
+    leading run of hours up to midnight, days up to the 1st, whole months,
+    then trailing days and hours. None if the range is not on hour boundaries.
+    """
+    if any((start.minute, start.second, start.microsecond, end.minute, end.second, end.microsecond)):
+        return None
+    segments: List[Tuple[str, str, str]] = []
+
+    def add(granularity: str, first: str, stop: str):
+        if segments and segments[-1][0] == granularity and segments[-1][2] == first:
+            segments[-1] = (granularity, segments[-1][1], stop)
+        else:
+            segments.append((granularity, first, stop))
+
+    current = start
+    while current < end:
+        if current.day == 1 and current.hour == 0 and _next_month(current) <= end:
+            following = _next_month(current)
+            add("month", current.strftime('%Y-%m'), following.strftime('%Y-%m'))
+        elif current.hour == 0 and current + timedelta(days=1) <= end:
+            following = current + timedelta(days=1)
+            add("day", current.date().isoformat(), following.date().isoformat())
+        else:
+            following = current + timedelta(hours=1)
+            add("hour", _hour_key(current), _hour_key(following))
+        current = following
+    return segments
+
+class TranscriptWarehouse:
+    """Local persistent copy of Voiceflow transcripts and usage series.
+
+    Synced projects are answered from here instead of the live analytics API,
+    for ranges inside the synced history: starting no earlier than the first
+    day the sync backfilled and ending before the last successful sync
+    (minus the overlap window that is still being revised).
+    """
+
+    def __init__(self):
+        self.db: Optional[Database] = None
+        # Synced project -> earliest synced day (None until known for older stores)
+        self._synced_from: Dict[str, Optional[str]] = {}
+        # Synced project -> end of the range covered by its last successful sync
+        self._synced_until: Dict[str, Optional[str]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.db is not None
+
+    async def connect(self):
+        if self.db is not None:
+            return
+        try:
+            self.db = await asyncio.to_thread(Database, settings.warehouse_url)
+            await asyncio.to_thread(self.db.execute_all, SCHEMA)
+            for migration in MIGRATIONS:
+                try:
+                    await asyncio.to_thread(self.db.execute_all, [migration])
+                except Exception:
+                    # Already applied
+                    pass
+            rows = await asyncio.to_thread(
+                self.db.query,
+                "SELECT project_id, synced_from, synced_until FROM sync_state WHERE watermark IS NOT NULL"
+            )
+            self._synced_from = {project_id: synced_from for project_id, synced_from, _ in rows}
+            self._synced_until = {project_id: synced_until for project_id, _, synced_until in rows}
+            # Stores created before rollups existed: build them once from the base tables
+            (has_rollups,), = await asyncio.to_thread(self.db.query, "SELECT COUNT(*) FROM rollups")
+            if not has_rollups:
+                for project_id in self._synced_from:
+                    await self.rebuild_rollups(project_id)
+            print("Warehouse connection successful")
+        except Exception as e:
+            print(f"Warehouse connection failed: {e}")
+            self.db = None
+
+    async def close(self):
+        if self.db is not None:
+            await asyncio.to_thread(self.db.close)
+            self.db = None
+
+    def covers(self, project_id: str, start_date: str, end_date: str) -> bool:
+        """True when the range lies inside the project's synced history.
+
+        Ranges starting before the backfill (e.g. a year-long overview), ending
+        after the last successful sync minus the overlap window, or for projects
+        no longer configured for syncing must go to the live API, so a stalled
+        sync never serves stale or incomplete data.
+        """
+        if not self.enabled or project_id not in settings.warehouse_projects:
+            return False
+        synced_from = self._synced_from.get(project_id)
+        synced_until = self._synced_until.get(project_id)
+        if synced_from is None or synced_until is None:
+            return False
+        settled = _parse_utc(synced_until) - timedelta(hours=settings.warehouse_sync_overlap_hours)
+        try:
+            return to_utc_iso(start_date) >= synced_from and _parse_utc(end_date) <= settled
+        except ValueError:
+            return False
+
+    # Writes (used by the sync worker)
+
+    async def get_watermark(self, project_id: str) -> Optional[str]:
+        rows = await asyncio.to_thread(
+            self.db.query, "SELECT watermark FROM sync_state WHERE project_id = ?", (project_id,)
+        )
+        return rows[0][0] if rows else None
+
+    async def set_watermark(self, project_id: str, watermark: str, synced_from: str, synced_until: str):
+        """Record a completed sync of everything up to synced_until;
+        synced_from only takes effect when none is stored yet"""
+        now = to_utc_iso(datetime.now(timezone.utc).isoformat())
+        await asyncio.to_thread(self.db.write, [(
+            """
+            INSERT INTO sync_state (project_id, watermark, last_synced_at, synced_from, synced_until)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (project_id) DO UPDATE SET watermark = excluded.watermark,
+                last_synced_at = excluded.last_synced_at,
+                synced_from = COALESCE(sync_state.synced_from, excluded.synced_from),
+                synced_until = excluded.synced_until
+            """,
+            [(project_id, watermark, now, synced_from, synced_until)]
+        )])
+        if self._synced_from.get(project_id) is None:
+            self._synced_from[project_id] = synced_from
+        self._synced_until[project_id] = synced_until
+
+    async def upsert_transcripts(self, project_id: str, transcripts: List[Dict[str, Any]]):
+        """Store raw transcripts with their processed fields, evaluations and properties"""
+        transcripts = [t for t in transcripts if t.get("id") and t.get("createdAt")]
+        if not transcripts:
+            return
+        rows = [transcript_row(transcript) for transcript in transcripts]
+        transcript_rows = [
+            (
+                row["id"], project_id, row["sessionID"], to_utc_iso(row["createdAt"]), row["endedAt"],
+                row["duration"], row["sentiment"],
+                None if row["resolution"] is None else int(row["resolution"]),
+                row["course_recommended"], row["user_question"], row["ai_summary"]
+            )
+            for row in rows
+        ]
+        evaluation_rows = [
+            (t["id"], e.get("name"), None if e.get("value") is None else str(e.get("value")))
+            for t in transcripts for e in t.get("evaluations", ()) if e.get("name")
+        ]
+        property_rows = [
+            (t["id"], p.get("name"), None if p.get("value") is None else str(p.get("value")))
+            for t in transcripts for p in t.get("properties", ()) if p.get("name")
+        ]
+        await asyncio.to_thread(self.db.write, [
+            (
+                """
+                INSERT INTO transcripts (id, project_id, session_id, created_at, ended_at, duration,
+                    sentiment, resolution, course_recommended, user_question, ai_summary)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET session_id = excluded.session_id,
+                    ended_at = excluded.ended_at, duration = excluded.duration,
+                    sentiment = excluded.sentiment, resolution = excluded.resolution,
+                    course_recommended = excluded.course_recommended,
+                    user_question = excluded.user_question, ai_summary = excluded.ai_summary
+                """,
+                transcript_rows
+            ),
+            (
+                """
+                INSERT INTO transcript_evaluations (transcript_id, name, value) VALUES (?, ?, ?)
+                ON CONFLICT (transcript_id, name) DO UPDATE SET value = excluded.value
+                """,
+                evaluation_rows
+            ),
+            (
+                """
+                INSERT INTO transcript_properties (transcript_id, name, value) VALUES (?, ?, ?)
+                ON CONFLICT (transcript_id, name) DO UPDATE SET value = excluded.value
+                """,
+                property_rows
+            ),
+        ])
+
+    async def upsert_usage(self, project_id: str, metric: str, items: List[Dict[str, Any]]):
+        rows = [
+            (project_id, metric, item["period"], item["period"][:10], item.get("count", 0))
+            for item in items if item.get("period")
+        ]
+        await asyncio.to_thread(self.db.write, [(
+            """
+            INSERT INTO usage_series (project_id, metric, period, day, count) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (project_id, metric, period) DO UPDATE SET count = excluded.count
+            """,
+            rows
+        )])
+
+    async def replace_intents(self, project_id: str, day: date, intents: List[Dict[str, Any]]):
+        day_str = day.isoformat()
+        await asyncio.to_thread(self.db.write, [
+            ("DELETE FROM intents_daily WHERE project_id = ? AND day = ?", [(project_id, day_str)]),
+            (
+                "INSERT INTO intents_daily (project_id, day, name, count) VALUES (?, ?, ?, ?)",
+                [(project_id, day_str, i.get("name", ""), i.get("count", 0)) for i in intents]
+            ),
+        ])
+
+    # Rollups: hour buckets are built from the base tables, days from hours and
+    # months from days; only buckets touched by a sync are recomputed
+
+    async def refresh_rollups(self, project_id: str, start_iso: str, end_iso: str):
+        await asyncio.to_thread(self._refresh_rollups, project_id, start_iso, end_iso)
+
+    async def rebuild_rollups(self, project_id: str):
+        """Recompute every rollup for a project from the base tables"""
+        (first, last), = await asyncio.to_thread(
+            self.db.query,
+            "SELECT MIN(day), MAX(day) FROM usage_series WHERE project_id = ?",
+            (project_id,)
+        )
+        (first_transcript, last_transcript), = await asyncio.to_thread(
+            self.db.query,
+            "SELECT MIN(created_at), MAX(created_at) FROM transcripts WHERE project_id = ?",
+            (project_id,)
+        )
+        bounds = [b for b in (first, last, first_transcript, last_transcript) if b]
+        if bounds:
+            start = min(b[:10] for b in bounds)
+            end = (date.fromisoformat(max(b[:10] for b in bounds)) + timedelta(days=1)).isoformat()
+            await self.refresh_rollups(project_id, f"{start}T00:00:00.000Z", f"{end}T00:00:00.000Z")
+
+    def _refresh_rollups(self, project_id: str, start_iso: str, end_iso: str):
+        # Widen to whole days so each touched day is rebuilt from all of its hours
+        start = _parse_utc(start_iso).replace(hour=0, minute=0, second=0, microsecond=0)
+        end_day = date.fromisoformat(_end_day_exclusive(end_iso))
+        end = datetime.combine(end_day, datetime.min.time(), tzinfo=timezone.utc)
+        start_day = start.date().isoformat()
+        hours: Dict[str, OverviewAggregator] = defaultdict(OverviewAggregator)
+
+        for hour, score, count, duration_sum, duration_count, resolved in self.db.query(
+            """
+            SELECT substr(created_at, 1, 13) AS hour, sentiment, COUNT(*), COALESCE(SUM(duration), 0),
+                COUNT(duration), COALESCE(SUM(CASE WHEN resolution = 1 THEN 1 ELSE 0 END), 0)
+            FROM transcripts WHERE project_id = ? AND created_at >= ? AND created_at < ?
+            GROUP BY substr(created_at, 1, 13), sentiment
+            """,
+            (project_id, to_utc_iso(start.isoformat()), to_utc_iso(end.isoformat()))
+        ):
+            bucket = hours[hour]
+            bucket.transcripts += count
+            bucket.duration_sum += int(duration_sum)
+            bucket.duration_count += duration_count
+            bucket.resolved += int(resolved)
+            if score is not None:
+                bucket.sentiment_hist[str(score)] = bucket.sentiment_hist.get(str(score), 0) + count
+                bucket.sentiment_sum += score * count
+                bucket.sentiment_count += count
+
+        for hour, session_id in self.db.query(
+            """
+            SELECT DISTINCT substr(created_at, 1, 13), session_id FROM transcripts
+            WHERE project_id = ? AND created_at >= ? AND created_at < ? AND session_id IS NOT NULL
+            """,
+            (project_id, to_utc_iso(start.isoformat()), to_utc_iso(end.isoformat()))
+        ):
+            hours[hour].users.add(session_id)
+
+        for hour, duration in self.db.query(
+            """
+            SELECT substr(created_at, 1, 13), duration FROM transcripts
+            WHERE project_id = ? AND created_at >= ? AND created_at < ? AND duration IS NOT NULL
+            """,
+            (project_id, to_utc_iso(start.isoformat()), to_utc_iso(end.isoformat()))
+        ):
+            hours[hour].durations.add(duration)
+
+        for metric, period, count in self.db.query(
+            "SELECT metric, period, count FROM usage_series WHERE project_id = ? AND day >= ? AND day < ?",
+            (project_id, start_day, end_day.isoformat())
+        ):
+            if metric == "interactions":
+                hours[_period_hour(period)].interactions += count
+            elif metric == "unique_users":
+                hours[_period_hour(period)].unique_users += count
+
+        for day, name, count in self.db.query(
+            "SELECT day, name, count FROM intents_daily WHERE project_id = ? AND day >= ? AND day < ?",
+            (project_id, start_day, end_day.isoformat())
+        ):
+            # Intents are daily totals: they live in the day's first hour
+            hours[f"{day}T00"].add_intents(({"name": name, "count": count},))
+
+        days: Dict[str, OverviewAggregator] = defaultdict(OverviewAggregator)
+        for hour, bucket in hours.items():
+            days[hour[:10]].merge(bucket)
+
+        self._replace_rollups(project_id, "hour", _hour_key(start), _hour_key(end), hours)
+        self._replace_rollups(project_id, "day", start_day, end_day.isoformat(), days)
+
+        # Months are rebuilt from all of their day rows, including days outside this window
+        month_start = start.replace(day=1)
+        month_end = _next_month(end.replace(day=1)) if end.day != 1 else end
+        months: Dict[str, OverviewAggregator] = defaultdict(OverviewAggregator)
+        for bucket, state in self.db.query(
+            """
+            SELECT bucket, state FROM rollups
+            WHERE project_id = ? AND granularity = 'day' AND bucket >= ? AND bucket < ?
+            """,
+            (project_id, month_start.date().isoformat(), month_end.date().isoformat())
+        ):
+            months[bucket[:7]].merge(OverviewAggregator.from_dict(json.loads(state)))
+        self._replace_rollups(
+            project_id, "month", month_start.strftime('%Y-%m'), month_end.strftime('%Y-%m'), months
+        )
+
+    def _replace_rollups(
+        self,
+        project_id: str,
+        granularity: str,
+        first: str,
+        stop: str,
+        buckets: Dict[str, OverviewAggregator]
+    ):
+        """Replace all rollup rows of one granularity in [first, stop); empty buckets are not stored"""
+        self.db.write([
+            (
+                "DELETE FROM rollups WHERE project_id = ? AND granularity = ? AND bucket >= ? AND bucket < ?",
+                [(project_id, granularity, first, stop)]
+            ),
+            (
+                "INSERT INTO rollups (project_id, granularity, bucket, state) VALUES (?, ?, ?, ?)",
+                [
+                    (project_id, granularity, key, json.dumps(bucket.to_dict()))
+                    for key, bucket in sorted(buckets.items())
+                ]
+            ),
+        ])
+
+    # Reads (used by the analytics endpoints)
+
+    async def get_overview_aggregate(self, project_id: str, start_date: str, end_date: str) -> OverviewAggregator:
+        """Answer from rollups when the range is on hour boundaries, else from raw rows"""
+        aggregate = await asyncio.to_thread(self._rollup_aggregate, project_id, start_date, end_date)
+        if aggregate is None:
+            aggregate = await asyncio.to_thread(self._overview_aggregate, project_id, start_date, end_date)
+        return aggregate
+
+    def _rollup_aggregate(self, project_id: str, start_date: str, end_date: str) -> Optional[OverviewAggregator]:
+        """Query router: merge the coarsest rollup rows that exactly cover the range"""
+        start, end = _parse_utc(start_date), _parse_utc(end_date)
+        segments = plan_rollup_segments(start, end)
+        if segments is None:
+            return None
+
+        aggregate = OverviewAggregator()
+        for granularity, first, stop in segments:
+            for (state,) in self.db.query(
+                """
+                SELECT state FROM rollups
+                WHERE project_id = ? AND granularity = ? AND bucket >= ? AND bucket < ?
+                """,
+                (project_id, granularity, first, stop)
+            ):
+                aggregate.merge(OverviewAggregator.from_dict(json.loads(state)))
+
+        # Rollups don't keep chart points; read them from the (one row per period) series
+        start_hour, end_hour = _hour_key(start), _hour_key(end)
+        aggregate.chart = [
+            {"date": period, "interactions": count}
+            for period, count in self.db.query(
+                """
+                SELECT period, count FROM usage_series
+                WHERE project_id = ? AND metric = 'interactions' AND day >= ? AND day < ? ORDER BY period
+                """,
+                (project_id, start.date().isoformat(), _end_day_exclusive(end_date))
+            )
+            if start_hour <= _period_hour(period) < end_hour
+        ]
+        return aggregate
+
+    def _overview_aggregate(self, project_id: str, start_date: str, end_date: str) -> OverviewAggregator:
+        start, end = to_utc_iso(start_date), to_utc_iso(end_date)
+        start_day, end_day = start[:10], _end_day_exclusive(end_date)
+        aggregate = OverviewAggregator()
+
+        (count, duration_sum, duration_count, resolved), = self.db.query(
+            """
+            SELECT COUNT(*), COALESCE(SUM(duration), 0), COUNT(duration),
+                COALESCE(SUM(CASE WHEN resolution = 1 THEN 1 ELSE 0 END), 0)
+            FROM transcripts WHERE project_id = ? AND created_at >= ? AND created_at < ?
+            """,
+            (project_id, start, end)
+        )
+        aggregate.transcripts = count
+        aggregate.duration_sum = int(duration_sum)
+        aggregate.duration_count = duration_count
+        aggregate.resolved = int(resolved)
+
+        for score, score_count in self.db.query(
+            """
+            SELECT sentiment, COUNT(*) FROM transcripts
+            WHERE project_id = ? AND created_at >= ? AND created_at < ? AND sentiment IS NOT NULL
+            GROUP BY sentiment
+            """,
+            (project_id, start, end)
+        ):
+            aggregate.sentiment_hist[str(score)] = score_count
+            aggregate.sentiment_sum += score * score_count
+            aggregate.sentiment_count += score_count
+
+        for (session_id,) in self.db.query(
+            """
+            SELECT DISTINCT session_id FROM transcripts
+            WHERE project_id = ? AND created_at >= ? AND created_at < ? AND session_id IS NOT NULL
+            """,
+            (project_id, start, end)
+        ):
+            aggregate.users.add(session_id)
+
+        for (duration,) in self.db.query(
+            """
+            SELECT duration FROM transcripts
+            WHERE project_id = ? AND created_at >= ? AND created_at < ? AND duration IS NOT NULL
+            """,
+            (project_id, start, end)
+        ):
+            aggregate.durations.add(duration)
+
+        usage = self.db.query(
+            """
+            SELECT metric, period, count FROM usage_series
+            WHERE project_id = ? AND day >= ? AND day < ? ORDER BY period
+            """,
+            (project_id, start_day, end_day)
+        )
+        aggregate.add_interactions(
+            {"period": period, "count": c} for metric, period, c in usage if metric == "interactions"
+        )
+        aggregate.add_unique_users(
+            {"period": period, "count": c} for metric, period, c in usage if metric == "unique_users"
+        )
+        aggregate.add_intents({"name": name, "count": c} for name, c in self._intent_totals(
+            project_id, start_day, end_day
+        ))
+        return aggregate
+
+    def _intent_totals(self, project_id: str, start_day: str, end_day: str, limit: int = 50) -> List[Tuple[str, int]]:
+        return self.db.query(
+            """
+            SELECT name, SUM(count) AS total FROM intents_daily
+            WHERE project_id = ? AND day >= ? AND day < ?
+            GROUP BY name ORDER BY total DESC LIMIT ?
+            """,
+            (project_id, start_day, end_day, limit)
+        )
+
+    async def get_top_intents(self, project_id: str, start_date: str, end_date: str, limit: int = 50) -> List[Dict[str, Any]]:
+        rows = await asyncio.to_thread(
+            self._intent_totals, project_id, to_utc_iso(start_date)[:10], _end_day_exclusive(end_date), limit
+        )
+        return [{"name": name, "count": int(count)} for name, count in rows]
+
+    async def get_transcripts(
+        self,
+        project_id: str,
+        start_date: str,
+        end_date: str,
+        limit: int = 100,
+        skip: int = 0,
+        order: str = "DESC"
+    ) -> List[Dict[str, Any]]:
+        """Transcripts in the /transcripts row format"""
+        direction = "ASC" if order.upper() == "ASC" else "DESC"
+        rows = await asyncio.to_thread(
+            self.db.query,
+            f"""
+            SELECT id, session_id, created_at, ended_at, duration, sentiment, resolution,
+                course_recommended, user_question, ai_summary
+            FROM transcripts WHERE project_id = ? AND created_at >= ? AND created_at < ?
+            ORDER BY created_at {direction} LIMIT ? OFFSET ?
+            """,
+            (project_id, to_utc_iso(start_date), to_utc_iso(end_date), limit, skip)
+        )
+        return [
+            dict(zip(TranscriptBatch.ROW_FIELDS, (
+                tid, session_id, created_at, ended_at, duration, sentiment,
+                None if resolution is None else bool(resolution), course, question, summary
+            )))
+            for tid, session_id, created_at, ended_at, duration, sentiment, resolution, course, question, summary in rows
+        ]
+
+class WarehouseSyncWorker:
+    """Periodically pulls new transcripts (by createdAt watermark) and usage series into the warehouse"""
+
+    def __init__(self, store: TranscriptWarehouse):
+        self.store = store
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None and settings.warehouse_projects:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            for project_id in settings.warehouse_projects:
+                try:
+                    await self.sync_project(project_id)
+                except Exception as e:
+                    print(f"Warehouse sync error for {project_id}: {e}")
+            await asyncio.sleep(settings.warehouse_sync_interval_seconds)
+
+    async def sync_project(self, project_id: str):
+        """Incremental sync from the watermark (minus an overlap window for late evaluations)"""
+        now = datetime.now(timezone.utc)
+        watermark = await self.store.get_watermark(project_id)
+        # First sync: this backfill start is the earliest day the store covers. Stores
+        # from before synced_from was tracked get the same (conservative) bound, since
+        # their original backfill reached at least this far back.
+        backfill_start = now - timedelta(days=settings.warehouse_backfill_days)
+        synced_from = to_utc_iso(
+            datetime.combine(backfill_start.date(), datetime.min.time(), tzinfo=timezone.utc).isoformat()
+        )
+        if watermark:
+            start = datetime.fromisoformat(watermark.replace('Z', '+00:00'))
+            start -= timedelta(hours=settings.warehouse_sync_overlap_hours)
+        else:
+            start = backfill_start
+        # Usage series and intents are daily, so resync them from the start of that day
+        start = datetime.combine(start.date(), datetime.min.time(), tzinfo=timezone.utc)
+        start_iso = to_utc_iso(start.isoformat())
+        end_iso = to_utc_iso(now.isoformat())
+
+        newest = watermark
+        page: List[Dict[str, Any]] = []
+        async for transcript in voiceflow_client.iter_transcripts(project_id, start_iso, end_iso):
+            page.append(transcript)
+            created_at = transcript.get("createdAt")
+            if created_at and (newest is None or to_utc_iso(created_at) > newest):
+                newest = to_utc_iso(created_at)
+            if len(page) >= settings.voiceflow_transcript_page_size:
+                await self.store.upsert_transcripts(project_id, page)
+                page = []
+        await self.store.upsert_transcripts(project_id, page)
+
+        interactions, unique_users = await asyncio.gather(
+            voiceflow_client.time_series_interactions(project_id, start_iso, end_iso),
+            voiceflow_client.time_series_unique_users(project_id, start_iso, end_iso)
+        )
+        await self.store.upsert_usage(project_id, "interactions", interactions)
+        await self.store.upsert_usage(project_id, "unique_users", unique_users)
+        await self._sync_intents(project_id, start.date(), now.date())
+        await self.store.refresh_rollups(project_id, start_iso, end_iso)
+
+        # Nothing newer than the previous watermark: the whole range up to now was
+        # checked, so move on instead of pulling the same window (and intents) again
+        if newest is None or newest == watermark:
+            newest = end_iso
+        await self.store.set_watermark(project_id, newest, synced_from, end_iso)
+
+    async def _sync_intents(self, project_id: str, first: date, last: date):
+        """Top intents only come as range totals, so store them per day"""
+        semaphore = asyncio.Semaphore(settings.warehouse_sync_concurrency)
+
+        async def sync_day(day: date):
+            async with semaphore:
+                intents = await voiceflow_client.top_intents(
+                    project_id, f"{day.isoformat()}T00:00:00.000Z",
+                    f"{(day + timedelta(days=1)).isoformat()}T00:00:00.000Z", limit=50
+                )
+            await self.store.replace_intents(project_id, day, intents)
+
+        await asyncio.gather(*[
+            sync_day(first + timedelta(days=i)) for i in range((last - first).days + 1)
+        ])
+
+# Global instances
+warehouse = TranscriptWarehouse()
+warehouse_sync = WarehouseSyncWorker(warehouse)
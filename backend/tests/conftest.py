@@ -0,0 +1,127 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List
+import pytest
+import pytest_asyncio
+from app.core.config import settings
+from app.services import overview
+from app.services.cache import CacheService
+from app.services.voiceflow_client import voiceflow_client
+from app.services.warehouse import TranscriptWarehouse, WarehouseSyncWorker
+
+class FakeVoiceflow:
+    """In-memory stand-in for the upstream API calls the sync and overview paths make"""
+
+    def __init__(self):
+        self.transcripts: List[Dict[str, Any]] = []
+        self.interactions: List[Dict[str, Any]] = []
+        self.unique_users: List[Dict[str, Any]] = []
+        self.intents: Dict[str, List[Dict[str, Any]]] = {}
+        self.calls: List[str] = []
+
+    def _in_range(self, value: str, start: str, end: str) -> bool:
+        return (not start or value >= start) and (not end or value < end)
+
+    async def list_transcripts(self, project_id, start, end, limit, skip, order):
+        self.calls.append("list_transcripts")
+        rows = sorted(
+            (t for t in self.transcripts if self._in_range(t["createdAt"], start, end)),
+            key=lambda t: t["createdAt"], reverse=order == "DESC"
+        )
+        return rows[skip:skip + limit]
+
+    async def time_series_interactions(self, project_id, start=None, end=None):
+        self.calls.append("interactions")
+        return sorted((item for item in self.interactions if self._in_range(item["period"], start, end)),
+                      key=lambda item: item["period"])
+
+    async def time_series_unique_users(self, project_id, start=None, end=None):
+        self.calls.append("unique_users")
+        return sorted((item for item in self.unique_users if self._in_range(item["period"], start, end)),
+                      key=lambda item: item["period"])
+
+    async def top_intents(self, project_id, start=None, end=None, limit=50):
+        self.calls.append("top_intents")
+        totals: Dict[str, int] = {}
+        for day, intents in self.intents.items():
+            if self._in_range(f"{day}T00:00:00.000Z", start, end):
+                for intent in intents:
+                    totals[intent["name"]] = totals.get(intent["name"], 0) + intent["count"]
+        ranked = sorted(totals.items(), key=lambda item: -item[1])[:limit]
+        return [{"name": name, "count": count} for name, count in ranked]
+
+    def add_day(self, day: date, transcripts: int, seed: int = 0):
+        """Populate one day: transcripts spread over the hours, hourly usage and intents"""
+        for i in range(transcripts):
+            hour = (i * 7 + seed) % 24
+            self.transcripts.append({
+                "id": f"{day.isoformat()}-{i}",
+                "sessionID": f"s{(i + seed) % 17}",
+                "createdAt": f"{day.isoformat()}T{hour:02d}:{i % 60:02d}:00.000Z",
+                "properties": [{"name": "duration", "value": str(30 + (i * 13 + seed) % 300)}],
+                "evaluations": [
+                    {"name": "Customer sentiment", "value": str(1 + (i + seed) % 5)},
+                    {"name": "Resolution achieved", "value": "true" if (i + seed) % 3 else "false"},
+                ],
+            })
+        for hour in range(24):
+            period = f"{day.isoformat()}T{hour:02d}:00:00.000Z"
+            self.interactions.append({"period": period, "count": (hour + seed) % 7})
+            self.unique_users.append({"period": period, "count": (hour + seed) % 3})
+        self.intents[day.isoformat()] = [
+            {"name": "greeting", "count": 5 + seed % 4},
+            {"name": "pricing", "count": 1 + (seed + day.day) % 5},
+        ]
+
+@pytest.fixture
+def fake_voiceflow(monkeypatch):
+    fake = FakeVoiceflow()
+    for name in ("list_transcripts", "time_series_interactions", "time_series_unique_users", "top_intents"):
+        monkeypatch.setattr(voiceflow_client, name, getattr(fake, name))
+    return fake
+
+@pytest.fixture
+def cache(monkeypatch):
+    """A fresh L1-only CacheService in place of the global one"""
+    service = CacheService()
+    monkeypatch.setattr(overview, "cache_service", service)
+    return service
+
+@pytest_asyncio.fixture
+async def redis_cache():
+    """A CacheService backed by an in-process fake Redis"""
+    fakeredis = pytest.importorskip("fakeredis")
+    service = CacheService()
+    service.redis_client = fakeredis.FakeAsyncRedis()
+    yield service
+    await service.close()
+
+@pytest_asyncio.fixture
+async def warehouse_store(monkeypatch):
+    monkeypatch.setattr(settings, "warehouse_url", "sqlite:///:memory:")
+    monkeypatch.setattr(settings, "warehouse_projects", ["p"])
+    store = TranscriptWarehouse()
+    await store.connect()
+    yield store
+    await store.close()
+
+@pytest.fixture
+def sync_worker(warehouse_store):
+    return WarehouseSyncWorker(warehouse_store)
+
+def utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+def day_iso(day: date) -> str:
+    return f"{day.isoformat()}T00:00:00.000Z"
+
+def days_ago(n: int) -> date:
+    return utc_today() - timedelta(days=n)
+
+def assert_same_overview(actual, expected):
+    # KLL compaction is randomized, so duration percentiles only agree within the sketch's error
+    actual, expected = actual.to_overview(), expected.to_overview()
+    actual_durations = actual["percentiles"].pop("session_duration")
+    expected_durations = expected["percentiles"].pop("session_duration")
+    assert actual == expected
+    for name, value in expected_durations.items():
+        assert actual_durations[name] == pytest.approx(value, abs=15)
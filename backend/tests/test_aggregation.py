@@ -0,0 +1,70 @@
+import json
+import pytest
+from app.services.aggregation import OverviewAggregator
+from conftest import FakeVoiceflow, assert_same_overview, days_ago
+
+@pytest.fixture(scope="module")
+def days():
+    """Transcripts, usage and intents for a week, one entry per day (oldest first)"""
+    fake = FakeVoiceflow()
+    days = []
+    for n in range(7, 0, -1):
+        day = days_ago(n).isoformat()
+        fake.add_day(days_ago(n), transcripts=40 + n * 3, seed=n)
+        days.append({
+            "transcripts": [t for t in fake.transcripts if t["createdAt"].startswith(day)],
+            "interactions": [i for i in fake.interactions if i["period"].startswith(day)],
+            "unique_users": [u for u in fake.unique_users if u["period"].startswith(day)],
+            "intents": fake.intents[day],
+        })
+    return days
+
+def aggregate(*parts):
+    aggregator = OverviewAggregator()
+    for part in parts:
+        aggregator.add_transcripts(part["transcripts"])
+        aggregator.add_interactions(part["interactions"])
+        aggregator.add_unique_users(part["unique_users"])
+        aggregator.add_intents(part["intents"])
+    return aggregator
+
+def test_merged_days_match_a_single_pass(days):
+    whole = aggregate(*days)
+    merged = OverviewAggregator()
+    for day in days:
+        merged.merge(aggregate(day))
+
+    assert_same_overview(merged, whole)
+    assert merged.users.count() == whole.users.count()
+    assert len(merged.durations) == len(whole.durations)
+
+def test_merge_order_does_not_change_totals(days):
+    forward, backward = OverviewAggregator(), OverviewAggregator()
+    for day in days:
+        forward.merge(aggregate(day))
+    for day in reversed(days):
+        backward.merge(aggregate(day))
+    assert forward.kpis() == backward.kpis()
+    assert forward.sentiment_distribution() == backward.sentiment_distribution()
+    assert forward.top_intents() == backward.top_intents()
+
+def test_round_trip_through_json(days):
+    original = aggregate(*days[:3])
+    restored = OverviewAggregator.from_dict(json.loads(json.dumps(original.to_dict())))
+    assert restored.to_overview() == original.to_overview()
+    assert restored.to_dict() == original.to_dict()
+
+def test_restored_partials_merge_like_the_originals(days):
+    direct, restored = OverviewAggregator(), OverviewAggregator()
+    for day in days:
+        partial = aggregate(day)
+        direct.merge(partial)
+        restored.merge(OverviewAggregator.from_dict(json.loads(json.dumps(partial.to_dict()))))
+    assert_same_overview(restored, direct)
+
+def test_empty_aggregate_round_trips_to_defaults():
+    empty = OverviewAggregator()
+    assert OverviewAggregator.from_dict(empty.to_dict()).to_overview() == empty.to_overview()
+    # Entries cached before the sketches existed have no users/durations fields
+    legacy = {key: value for key, value in aggregate().to_dict().items() if key not in ("users", "durations")}
+    assert OverviewAggregator.from_dict(legacy).to_overview() == empty.to_overview()
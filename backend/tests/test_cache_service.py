@@ -0,0 +1,156 @@
+import asyncio
+import json
+import time
+import pytest
+from app.core.config import settings
+from app.services.cache import CachedFetchError, CacheService, MISSING
+
+class Upstream:
+    """A fetch_fn that counts calls and fails or degrades on demand"""
+
+    def __init__(self, value="fresh"):
+        self.value = value
+        self.calls = 0
+        self.error = None
+        self.delay = 0.0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.value
+
+async def store_aged(service, cache_key, value, age, ttl=3600):
+    """Store an envelope as if it had been written `age` seconds ago"""
+    await service._store(cache_key, {"v": value, "t": time.time() - age}, ttl)
+
+@pytest.mark.asyncio
+async def test_failures_are_negatively_cached(redis_cache):
+    upstream = Upstream()
+    upstream.error = RuntimeError("upstream down")
+    for _ in range(3):
+        with pytest.raises((RuntimeError, CachedFetchError)):
+            await redis_cache.get_cached_or_fetch("compare:p:a:b", upstream)
+    assert upstream.calls == 1
+    ttl = await redis_cache.redis_client.ttl("compare:p:a:b")
+    assert 0 < ttl <= settings.cache_negative_ttl_seconds * (1 + settings.cache_negative_ttl_jitter)
+    # A failure is not a value
+    assert await redis_cache.get("compare:p:a:b") is MISSING
+
+@pytest.mark.asyncio
+async def test_degraded_payloads_are_cached_briefly(redis_cache):
+    upstream = Upstream({"metrics": {}, "error": "timeout"})
+    assert await redis_cache.get_cached_or_fetch("overview:p:a:b", upstream) == upstream.value
+    assert await redis_cache.redis_client.ttl("overview:p:a:b") <= settings.cache_negative_ttl_seconds * 2
+    # Never kept as last known good
+    assert await redis_cache.redis_client.exists("lkg:overview:p:a:b") == 0
+
+@pytest.mark.asyncio
+async def test_last_good_value_is_served_when_upstream_fails(redis_cache):
+    upstream = Upstream({"metrics": {"total_interactions": 5}})
+    await redis_cache.get_cached_or_fetch("overview:p:a:b", upstream, ttl_minutes=1)
+
+    # Kept in Redis only, not in the L1 tier
+    assert redis_cache.memory.get("lkg:overview:p:a:b") is MISSING
+    assert await redis_cache.redis_client.ttl("lkg:overview:p:a:b") > 86400
+
+    await redis_cache.redis_client.delete("overview:p:a:b")
+    redis_cache.memory.delete_pattern("*")
+    upstream.error = RuntimeError("upstream down")
+    served = await redis_cache.get_cached_or_fetch("overview:p:a:b", upstream, ttl_minutes=1)
+    assert served["metrics"] == {"total_interactions": 5}
+    assert served["stale"] is True and served["stale_as_of"].endswith("Z")
+    assert redis_cache.memory.get("lkg:overview:p:a:b") is MISSING
+
+    # Degraded payloads are replaced by the last good value as well
+    upstream.error = None
+    upstream.value = {"metrics": {}, "error": "timeout"}
+    await redis_cache.redis_client.delete("overview:p:a:b")
+    redis_cache.memory.delete_pattern("*")
+    served = await redis_cache.get_cached_or_fetch("overview:p:a:b", upstream, ttl_minutes=1)
+    assert served["metrics"] == {"total_interactions": 5} and served["stale"] is True
+
+@pytest.mark.asyncio
+async def test_last_good_stays_in_memory_without_redis(cache):
+    upstream = Upstream({"metrics": {"total_interactions": 5}})
+    await cache.get_cached_or_fetch("overview:p:a:b", upstream, ttl_minutes=1)
+    cache.memory.delete_pattern("overview:*")
+    upstream.error = RuntimeError("upstream down")
+    served = await cache.get_cached_or_fetch("overview:p:a:b", upstream, ttl_minutes=1)
+    assert served["stale"] is True
+
+@pytest.mark.asyncio
+async def test_other_prefixes_keep_no_last_good_copy(redis_cache):
+    upstream = Upstream()
+    await redis_cache.get_cached_or_fetch("compare:p:a:b", upstream, ttl_minutes=1)
+    assert await redis_cache.redis_client.exists("lkg:compare:p:a:b") == 0
+    stored = json.loads(await redis_cache.redis_client.get("compare:p:a:b"))
+    assert stored["v"] == "fresh"
+
+@pytest.mark.asyncio
+async def test_fresh_entries_are_served_without_fetching(redis_cache, monkeypatch):
+    monkeypatch.setitem(settings.cache_policies, "overview", {"soft_ttl": 60, "hard_ttl": 600})
+    await store_aged(redis_cache, "overview:p:a:b", "cached", age=10)
+    upstream = Upstream()
+    assert await redis_cache.get_cached_or_fetch("overview:p:a:b", upstream) == "cached"
+    assert upstream.calls == 0
+
+@pytest.mark.asyncio
+async def test_stale_entries_are_served_while_refreshing(redis_cache, monkeypatch):
+    monkeypatch.setitem(settings.cache_policies, "overview", {"soft_ttl": 60, "hard_ttl": 600})
+    await store_aged(redis_cache, "overview:p:a:b", "stale", age=120)
+    upstream = Upstream()
+    upstream.delay = 0.05
+    served = await asyncio.gather(*[redis_cache.get_cached_or_fetch("overview:p:a:b", upstream) for _ in range(5)])
+    assert served == ["stale"] * 5
+
+    await asyncio.gather(*redis_cache._background)
+    # One background refresh for all five stale reads
+    assert upstream.calls == 1
+    assert await redis_cache.get_cached_or_fetch("overview:p:a:b", upstream) == "fresh"
+    assert upstream.calls == 1
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_fetched_in_the_foreground(redis_cache, monkeypatch):
+    monkeypatch.setitem(settings.cache_policies, "overview", {"soft_ttl": 60, "hard_ttl": 600})
+    await store_aged(redis_cache, "overview:p:a:b", "expired", age=900)
+    upstream = Upstream()
+    assert await redis_cache.get_cached_or_fetch("overview:p:a:b", upstream) == "fresh"
+    assert upstream.calls == 1
+    assert not redis_cache._background
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_fetch(redis_cache):
+    upstream = Upstream()
+    upstream.delay = 0.05
+    served = await asyncio.gather(*[redis_cache.get_cached_or_fetch("compare:p:a:b", upstream) for _ in range(10)])
+    assert served == ["fresh"] * 10
+    assert upstream.calls == 1
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_shared_fetch(redis_cache):
+    upstream = Upstream()
+    upstream.delay = 0.05
+    first = asyncio.ensure_future(redis_cache.get_cached_or_fetch("compare:p:a:b", upstream))
+    second = asyncio.ensure_future(redis_cache.get_cached_or_fetch("compare:p:a:b", upstream))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert await second == "fresh"
+    assert upstream.calls == 1
+
+@pytest.mark.asyncio
+async def test_workers_sharing_redis_fetch_once(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(settings, "cache_lock_poll_interval_seconds", 0.01)
+    server = fakeredis.FakeServer()
+    workers = [CacheService() for _ in range(3)]
+    for worker in workers:
+        worker.redis_client = fakeredis.FakeAsyncRedis(server=server)
+    upstream = Upstream()
+    upstream.delay = 0.05
+    served = await asyncio.gather(*[worker.get_cached_or_fetch("compare:p:a:b", upstream) for worker in workers])
+    assert served == ["fresh"] * 3
+    assert upstream.calls == 1
+    assert not await workers[0].redis_client.exists("lock:compare:p:a:b")
@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from starlette.responses import StreamingResponse
+from app.core.config import settings
+from app.models.analytics import ExportRequest
+from app.services.database import Database
+from app.services.export_jobs import ExportJobManager
+
+def export_request(project_id="p"):
+    return ExportRequest(project_id=project_id, start="2025-10-01", end="2025-10-02", format="ndjson", dataset="transcripts")
+
+class Renderer:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.started = asyncio.Event()
+        self.runs = 0
+
+    async def __call__(self, request):
+        self.runs += 1
+
+        async def body():
+            self.started.set()
+            yield b'{"id": 1}\n'
+            await asyncio.sleep(self.delay)
+            yield b'{"id": 2}\n'
+
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+@pytest.fixture(autouse=True)
+def job_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "export_jobs_url", f"sqlite:///{tmp_path}/jobs.db")
+    monkeypatch.setattr(settings, "export_storage_dir", str(tmp_path / "exports"))
+    monkeypatch.setattr(settings, "export_job_poll_seconds", 0.05)
+
+@pytest_asyncio.fixture
+async def managers():
+    started = []
+    yield started
+    for manager in started:
+        await manager.stop()
+
+async def wait_for_status(manager, job_id, status, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        job = await manager.get(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"job {job_id} is {job['status']}, expected {status}")
+
+@pytest.mark.asyncio
+async def test_submitted_job_writes_its_artifact(managers):
+    manager = ExportJobManager()
+    managers.append(manager)
+    await manager.start(Renderer())
+    job = await manager.submit(export_request())
+    done = await wait_for_status(manager, job["id"], "succeeded")
+    with open(done["path"], "rb") as f:
+        assert f.read() == b'{"id": 1}\n{"id": 2}\n'
+    assert done["bytes_written"] == 20
+
+@pytest.mark.asyncio
+async def test_queued_rows_from_other_processes_are_claimed_once(managers):
+    renderer = Renderer(delay=0.1)
+    first, second = ExportJobManager(), ExportJobManager()
+    managers.extend([first, second])
+    await first.start(renderer)
+    await second.start(renderer)
+    # Queued by a process that died before running it: nobody was told about it
+    await asyncio.to_thread(second.db.execute, """
+        INSERT INTO export_jobs (id, dedupe_key, status, request, created_at)
+        VALUES ('orphan', 'k', 'queued', ?, '2025-10-01T00:00:00.000Z')
+    """, (export_request().model_dump_json(),))
+    await wait_for_status(first, "orphan", "succeeded")
+    assert renderer.runs == 1
+
+@pytest.mark.asyncio
+async def test_job_interrupted_by_shutdown_is_queued_again(managers):
+    renderer = Renderer(delay=10)
+    manager = ExportJobManager()
+    await manager.start(renderer)
+    job = await manager.submit(export_request())
+    await asyncio.wait_for(renderer.started.wait(), 2)
+    await manager.stop()
+    db = Database(settings.export_jobs_url)
+    status, started_at = db.query("SELECT status, started_at FROM export_jobs WHERE id = ?", (job["id"],))[0]
+    db.close()
+    assert (status, started_at) == ("queued", None)
+
+    # The next process picks it up
+    restarted = ExportJobManager()
+    managers.append(restarted)
+    await restarted.start(Renderer())
+    await wait_for_status(restarted, job["id"], "succeeded")
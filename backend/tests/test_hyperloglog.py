@@ -0,0 +1,59 @@
+import pytest
+from app.services.sketches import HyperLogLog
+
+def _sketch(values, precision=12):
+    sketch = HyperLogLog(precision)
+    sketch.update(values)
+    return sketch
+
+@pytest.mark.parametrize("n", [100, 5_000, 50_000, 200_000])
+def test_count_within_error_bound(n):
+    sketch = _sketch(f"session-{i}" for i in range(n))
+    # Three standard errors (1.04 / sqrt(4096) ~ 1.6%) keeps this deterministic test meaningful
+    assert abs(sketch.count() - n) / n < 3 * 1.04 / (4096 ** 0.5)
+
+def test_duplicates_do_not_change_count():
+    once = _sketch(f"user-{i}" for i in range(1_000))
+    repeated = _sketch(f"user-{i % 1_000}" for i in range(10_000))
+    assert once.registers == repeated.registers
+
+def test_empty_sketch():
+    sketch = HyperLogLog()
+    assert sketch.is_empty()
+    assert sketch.count() == 0
+
+def test_merge_equals_sketch_of_union():
+    left = _sketch(f"user-{i}" for i in range(0, 30_000))
+    right = _sketch(f"user-{i}" for i in range(20_000, 50_000))
+    union = _sketch(f"user-{i}" for i in range(0, 50_000))
+    merged = left.merge(right)
+    assert merged.registers == union.registers
+    assert abs(merged.count() - 50_000) / 50_000 < 0.05
+
+def test_merge_does_not_double_count_overlap():
+    days = [_sketch(f"user-{i}" for i in range(1_000)) for _ in range(7)]
+    total = HyperLogLog()
+    for day in days:
+        total.merge(day)
+    assert total.registers == days[0].registers
+
+def test_merge_rejects_different_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(12).merge(HyperLogLog(10))
+
+def test_string_round_trip():
+    sketch = _sketch(f"user-{i}" for i in range(2_500))
+    restored = HyperLogLog.from_str(sketch.to_str())
+    assert restored.precision == sketch.precision
+    assert restored.registers == sketch.registers
+    assert restored.count() == sketch.count()
+
+def test_corrupt_string_rejected():
+    encoded = HyperLogLog(12).to_str()
+    with pytest.raises(ValueError):
+        HyperLogLog.from_str("10:" + encoded.split(":", 1)[1])
+
+@pytest.mark.parametrize("precision", [3, 17])
+def test_precision_bounds(precision):
+    with pytest.raises(ValueError):
+        HyperLogLog(precision)
@@ -0,0 +1,76 @@
+import json
+import random
+from bisect import bisect_left, bisect_right
+import pytest
+from app.services.sketches import KLLSketch
+
+QS = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+def _rank_error(values, q, estimate):
+    """Distance between q and the normalized rank range of the estimate"""
+    low = bisect_left(values, estimate) / len(values)
+    high = bisect_right(values, estimate) / len(values)
+    if low <= q <= high:
+        return 0.0
+    return min(abs(q - low), abs(q - high))
+
+def test_small_inputs_are_exact():
+    sketch = KLLSketch(k=200)
+    sketch.update(range(1, 101))
+    assert sketch.quantiles([0.01, 0.5, 1.0]) == [1, 50, 100]
+
+def test_empty_sketch():
+    assert KLLSketch().quantiles([0.5, 0.9]) == [None, None]
+
+def test_rank_error_on_a_stream():
+    values = list(range(100_000))
+    random.Random(1).shuffle(values)
+    sketch = KLLSketch(k=200, seed=1)
+    sketch.update(values)
+    values.sort()
+    for q, estimate in zip(QS, sketch.quantiles(QS)):
+        assert _rank_error(values, q, estimate) < 0.02
+
+def test_rank_error_after_merge():
+    rng = random.Random(2)
+    values = [rng.lognormvariate(5, 1) for _ in range(80_000)]
+    parts = [KLLSketch(k=200, seed=i) for i in range(8)]
+    for i, value in enumerate(values):
+        parts[i % 8].add(value)
+    merged = KLLSketch(k=200, seed=99)
+    for part in parts:
+        merged.merge(part)
+    values.sort()
+    assert len(merged) == len(values)
+    for q, estimate in zip(QS, merged.quantiles(QS)):
+        assert _rank_error(values, q, estimate) < 0.02
+
+def test_size_stays_bounded():
+    sketch = KLLSketch(k=200, seed=3)
+    sketch.update(range(200_000))
+    assert sum(len(level) for level in sketch.levels) < 3 * 200 * 2
+
+def test_round_trip_through_json():
+    sketch = KLLSketch(k=100, seed=4)
+    sketch.update(random.Random(4).random() for _ in range(20_000))
+    restored = KLLSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+    assert restored.k == sketch.k
+    assert len(restored) == len(sketch)
+    assert restored.quantiles(QS) == sketch.quantiles(QS)
+
+def test_round_tripped_sketch_still_merges():
+    values = list(range(50_000))
+    first, second = KLLSketch(k=200, seed=5), KLLSketch(k=200, seed=6)
+    first.update(values[::2])
+    second.update(values[1::2])
+    merged = KLLSketch.from_dict(first.to_dict()).merge(KLLSketch.from_dict(second.to_dict()))
+    assert len(merged) == len(values)
+    for q, estimate in zip(QS, merged.quantiles(QS)):
+        assert _rank_error(values, q, estimate) < 0.02
+
+@pytest.mark.parametrize("data", [{}, {"k": 50}, {"k": 50, "levels": []}])
+def test_from_dict_defaults(data):
+    sketch = KLLSketch.from_dict(data)
+    assert len(sketch) == 0
+    sketch.add(1.0)
+    assert sketch.quantiles([0.5]) == [1.0]
@@ -0,0 +1,82 @@
+from datetime import timedelta
+import pytest
+from app.core.config import settings
+from app.services.cache import MISSING
+from app.services.overview import OverviewService
+from app.services.voiceflow_client import voiceflow_client
+from conftest import day_iso, days_ago, utc_today
+
+@pytest.fixture
+def populated(fake_voiceflow):
+    for n in range(1, 15):
+        fake_voiceflow.add_day(days_ago(n), transcripts=3 + n % 4, seed=n)
+    return fake_voiceflow
+
+@pytest.mark.asyncio
+async def test_day_buckets_match_the_raw_range_overview(populated, cache):
+    start, end = day_iso(days_ago(10)), day_iso(days_ago(2))
+    composed = await OverviewService().get_overview("p", start, end)
+    raw = await voiceflow_client.get_analytics_overview("p", start, end)
+    assert composed == raw
+
+@pytest.mark.asyncio
+async def test_overlapping_range_only_fetches_missing_days(populated, cache, monkeypatch):
+    service = OverviewService()
+    fetched = []
+    fetch_run = service._fetch_run
+
+    async def recording_fetch_run(project_id, first, last):
+        fetched.append((first, last))
+        return await fetch_run(project_id, first, last)
+
+    monkeypatch.setattr(service, "_fetch_run", recording_fetch_run)
+
+    await service.get_overview("p", day_iso(days_ago(10)), day_iso(days_ago(5)))
+    assert fetched == [(days_ago(10), days_ago(6))]
+
+    fetched.clear()
+    sliding = await service.get_overview("p", day_iso(days_ago(8)), day_iso(days_ago(2)))
+    assert fetched == [(days_ago(5), days_ago(3))]
+    assert sliding == await voiceflow_client.get_analytics_overview("p", day_iso(days_ago(8)), day_iso(days_ago(2)))
+
+@pytest.mark.asyncio
+async def test_intents_use_one_range_call(populated, cache):
+    service = OverviewService()
+    populated.calls.clear()
+    overview = await service.get_overview("p", day_iso(days_ago(14)), day_iso(days_ago(1)))
+    assert populated.calls.count("top_intents") == 1
+    totals = {item["intent"]: item["count"] for item in overview["top_intents"]}
+    assert totals["greeting"] == sum(i[0]["count"] for d, i in populated.intents.items() if d < days_ago(1).isoformat())
+
+    # Cached together with the day buckets: a repeat makes no upstream calls
+    populated.calls.clear()
+    assert await service.get_overview("p", day_iso(days_ago(14)), day_iso(days_ago(1))) == overview
+    assert populated.calls == []
+
+@pytest.mark.asyncio
+async def test_unaligned_ranges_go_upstream(populated, cache):
+    start = day_iso(days_ago(5)).replace("T00", "T06")
+    end = day_iso(days_ago(2))
+    assert await OverviewService().get_overview("p", start, end) == (
+        await voiceflow_client.get_analytics_overview("p", start, end)
+    )
+    assert await cache.get(f"overview_day:p:{days_ago(5).isoformat()}") is MISSING
+
+def test_days_stay_live_until_the_historical_lag_has_passed(monkeypatch):
+    service = OverviewService()
+    monkeypatch.setattr(settings, "cache_historical_lag_hours", 24)
+    assert service._day_prefix(utc_today()) == "overview_live"
+    # Yesterday ended less than 24h ago
+    assert service._day_prefix(days_ago(1)) == "overview_live"
+    assert service._day_prefix(days_ago(2)) == "overview_day"
+
+    monkeypatch.setattr(settings, "cache_historical_lag_hours", 0)
+    assert service._day_prefix(days_ago(1)) == "overview_day"
+    assert service._day_ttl(days_ago(1)) > settings.cache_policies["overview_live"]["hard_ttl"]
+    assert service._day_ttl(utc_today()) == settings.cache_policies["overview_live"]["hard_ttl"]
+
+def test_day_keys_switch_prefix_when_settled(monkeypatch):
+    service = OverviewService()
+    monkeypatch.setattr(settings, "cache_historical_lag_hours", 24)
+    assert service._day_key("p", days_ago(1)) == f"overview_live:p:{days_ago(1).isoformat()}"
+    assert service._day_key("p", days_ago(1) - timedelta(days=5)).startswith("overview_day:")
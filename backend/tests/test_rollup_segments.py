@@ -0,0 +1,65 @@
+import random
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.services.warehouse import plan_rollup_segments
+
+def _utc(value: str) -> datetime:
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+def _bounds(granularity: str, bucket: str) -> datetime:
+    formats = {"hour": "%Y-%m-%dT%H", "day": "%Y-%m-%d", "month": "%Y-%m"}
+    return datetime.strptime(bucket, formats[granularity]).replace(tzinfo=timezone.utc)
+
+def _assert_covers(segments, start: datetime, end: datetime):
+    """Segments are contiguous, in order, and cover exactly [start, end)"""
+    current = start
+    for granularity, first, stop in segments:
+        assert _bounds(granularity, first) == current
+        current = _bounds(granularity, stop)
+    assert current == end
+    # Adjacent runs of the same granularity are merged
+    for previous, following in zip(segments, segments[1:]):
+        assert previous[0] != following[0]
+
+def test_mid_month_range():
+    start, end = _utc("2025-01-30T22:00:00"), _utc("2025-04-02T03:00:00")
+    segments = plan_rollup_segments(start, end)
+    assert segments == [
+        ("hour", "2025-01-30T22", "2025-01-31T00"),
+        ("day", "2025-01-31", "2025-02-01"),
+        ("month", "2025-02", "2025-04"),
+        ("day", "2025-04-01", "2025-04-02"),
+        ("hour", "2025-04-02T00", "2025-04-02T03"),
+    ]
+    _assert_covers(segments, start, end)
+
+def test_hours_within_one_day():
+    start, end = _utc("2025-06-10T05:00:00"), _utc("2025-06-10T11:00:00")
+    assert plan_rollup_segments(start, end) == [("hour", "2025-06-10T05", "2025-06-10T11")]
+
+def test_whole_days():
+    start, end = _utc("2025-06-10T00:00:00"), _utc("2025-06-17T00:00:00")
+    assert plan_rollup_segments(start, end) == [("day", "2025-06-10", "2025-06-17")]
+
+def test_whole_year_is_months_across_year_end():
+    start, end = _utc("2024-07-01T00:00:00"), _utc("2025-07-01T00:00:00")
+    assert plan_rollup_segments(start, end) == [("month", "2024-07", "2025-07")]
+
+def test_empty_range():
+    moment = _utc("2025-06-10T05:00:00")
+    assert plan_rollup_segments(moment, moment) == []
+
+@pytest.mark.parametrize("start, end", [
+    ("2025-06-10T05:30:00", "2025-06-11T00:00:00"),
+    ("2025-06-10T05:00:00", "2025-06-11T00:00:01"),
+])
+def test_unaligned_ranges_are_rejected(start, end):
+    assert plan_rollup_segments(_utc(start), _utc(end)) is None
+
+def test_random_hour_aligned_ranges_are_covered():
+    rng = random.Random(7)
+    origin = _utc("2024-01-01T00:00:00")
+    for _ in range(300):
+        start = origin + timedelta(hours=rng.randrange(0, 24 * 500))
+        end = start + timedelta(hours=rng.randrange(0, 24 * 120))
+        _assert_covers(plan_rollup_segments(start, end), start, end)
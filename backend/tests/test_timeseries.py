@@ -0,0 +1,73 @@
+import random
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.services.timeseries import lttb, rebucket, shape_chart
+
+def _series(n: int, hours: int = 1, seed: int = 0):
+    rng = random.Random(seed)
+    origin = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {"date": (origin + timedelta(hours=i * hours)).strftime('%Y-%m-%dT%H:%M:%S.000Z'), "interactions": rng.randrange(100)}
+        for i in range(n)
+    ]
+
+@pytest.mark.parametrize("n, threshold", [(1_000, 100), (500, 3), (101, 100), (10, 9)])
+def test_lttb_keeps_endpoints_and_point_budget(n, threshold):
+    points = _series(n)
+    sampled = lttb(points, threshold)
+    assert len(sampled) == threshold
+    assert sampled[0] == points[0]
+    assert sampled[-1] == points[-1]
+    dates = [point["date"] for point in sampled]
+    assert dates == sorted(dates)
+    assert all(point in points for point in sampled)
+
+@pytest.mark.parametrize("threshold", [2, 50, 51, 500])
+def test_lttb_returns_small_series_unchanged(threshold):
+    points = _series(50)
+    assert lttb(points, threshold) == points
+
+def test_lttb_keeps_a_spike():
+    points = [{"date": p["date"], "interactions": 10} for p in _series(1_000)]
+    points[637]["interactions"] = 10_000
+    assert points[637] in lttb(points, 50)
+
+def test_lttb_orders_input_and_drops_unparseable():
+    points = _series(20)
+    shuffled = list(reversed(points)) + [{"date": "not a date", "interactions": 5}]
+    assert lttb(shuffled, 100) == points
+
+def test_rebucket_to_days_preserves_totals():
+    points = _series(24 * 10, seed=3)
+    days = rebucket(points, "day")
+    assert len(days) == 10
+    assert sum(p["interactions"] for p in days) == sum(p["interactions"] for p in points)
+    assert days[0]["date"] == "2025-01-01T00:00:00.000Z"
+
+def test_rebucket_weeks_start_on_monday():
+    weeks = rebucket(_series(30, hours=24), "week")
+    for point in weeks:
+        assert datetime.fromisoformat(point["date"].replace('Z', '+00:00')).weekday() == 0
+
+def test_rebucket_finer_than_series_keeps_points():
+    daily = _series(5, hours=24)
+    assert rebucket(daily, "hour") == daily
+
+def test_rebucket_handles_date_only_periods_and_drops_unparseable():
+    points = [
+        {"date": "2025-03-01", "interactions": 2},
+        {"date": "2025-03-15T10:00:00Z", "interactions": 3},
+        {"date": "", "interactions": 100},
+    ]
+    assert rebucket(points, "month") == [{"date": "2025-03-01T00:00:00.000Z", "interactions": 5}]
+
+def test_shape_chart_without_options_returns_payload_as_is():
+    data = {"interactions_chart": _series(10)}
+    assert shape_chart(data, "2025-01-01", "2025-01-02") is data
+
+def test_shape_chart_applies_granularity_and_budget():
+    data = {"metrics": {}, "interactions_chart": _series(24 * 60)}
+    shaped = shape_chart(data, "2025-01-01T00:00:00Z", "2025-03-02T00:00:00Z", "day", 20)
+    assert len(shaped["interactions_chart"]) == 20
+    assert shaped["metrics"] is data["metrics"]
+    assert len(data["interactions_chart"]) == 24 * 60
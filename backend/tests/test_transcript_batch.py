@@ -0,0 +1,80 @@
+import random
+from app.services.aggregation import OverviewAggregator
+from app.services.transcript_batch import TranscriptBatch, transcript_row
+
+def _transcripts(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    transcripts = []
+    for i in range(n):
+        properties = []
+        if i % 5:
+            # Numbers, numeric strings, nulls, garbage and a missing value
+            properties.append({"name": "duration", **rng.choice([
+                {"value": str(rng.randrange(600))}, {"value": rng.randrange(600)},
+                {"value": None}, {"value": "n/a"}, {}
+            ])})
+        evaluations = []
+        if i % 4:
+            evaluations.append({"name": "Customer sentiment", **rng.choice([
+                {"value": str(rng.randint(1, 5))}, {"value": None}, {}
+            ])})
+            evaluations.append({"name": "Resolution achieved", "value": rng.choice(["true", "false"])})
+            evaluations.append({"name": "AI course chosen", "value": rng.choice(["A", "B", None])})
+        transcripts.append({
+            "id": f"t{i}",
+            "sessionID": rng.choice([f"s{rng.randrange(40)}", None, ""]),
+            "createdAt": f"2025-03-{1 + i % 3:02d}T{i % 24:02d}:00:00.000Z",
+            "properties": properties,
+            "evaluations": evaluations,
+        })
+    return transcripts
+
+def _streamed(transcripts) -> OverviewAggregator:
+    aggregator = OverviewAggregator()
+    aggregator.add_transcripts(transcripts)
+    return aggregator
+
+def _assert_same(vectorized: OverviewAggregator, streamed: OverviewAggregator):
+    left, right = vectorized.to_dict(), streamed.to_dict()
+    # Compaction order differs, so the duration sketches are compared by their quantiles
+    left.pop("durations"), right.pop("durations")
+    assert left == right
+    qs = [0.1, 0.5, 0.9]
+    assert vectorized.durations.quantiles(qs) == streamed.durations.quantiles(qs)
+    assert vectorized.kpis() == streamed.kpis()
+    assert vectorized.sentiment_distribution() == streamed.sentiment_distribution()
+
+def test_to_aggregator_matches_streaming_aggregation():
+    transcripts = _transcripts(150)
+    _assert_same(TranscriptBatch.from_raw(transcripts).to_aggregator(), _streamed(transcripts))
+
+def test_to_aggregator_skips_null_durations():
+    transcripts = [
+        {"id": "a", "properties": [{"name": "duration", "value": "100"}]},
+        {"id": "b", "properties": [{"name": "duration", "value": None}]},
+        {"id": "c", "properties": [{"name": "duration"}]},
+    ]
+    aggregator = TranscriptBatch.from_raw(transcripts).to_aggregator()
+    assert (aggregator.duration_sum, aggregator.duration_count) == (100, 2)
+    _assert_same(aggregator, _streamed(transcripts))
+
+def test_to_day_aggregators_split_by_created_day():
+    transcripts = _transcripts(90, seed=1) + [{"id": "no-date", "sessionID": "x"}]
+    days = TranscriptBatch.from_raw(transcripts).to_day_aggregators()
+    assert sorted(days) == ["2025-03-01", "2025-03-02", "2025-03-03"]
+    for day, aggregator in days.items():
+        _assert_same(aggregator, _streamed([t for t in transcripts if t.get("createdAt", "").startswith(day)]))
+
+def test_empty_batch():
+    aggregator = TranscriptBatch.from_raw([]).to_aggregator()
+    assert aggregator.transcripts == 0
+    assert TranscriptBatch.from_raw([]).to_day_aggregators() == {}
+
+def test_transcript_row_matches_batch_columns():
+    transcripts = _transcripts(40, seed=2)
+    batch = TranscriptBatch.from_raw(transcripts)
+    rows = [transcript_row(t) for t in transcripts]
+    assert [row["duration"] for row in rows] == [
+        int(d) if valid else None for d, valid in zip(batch.duration, batch.duration_valid)
+    ]
+    assert [row["resolution"] for row in rows] == [None if r < 0 else bool(r) for r in batch.resolution]
@@ -0,0 +1,61 @@
+import io
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from app.core.config import settings
+from app.services.transcript_batch import TranscriptBatch
+from app.services.transcript_export import TranscriptChunk, stream_columnar
+
+def raw_page(start: int, rows: int):
+    return [
+        {"id": f"t{i}", "sessionID": f"s{i % 7}", "createdAt": f"2025-10-01T00:{i % 60:02d}:00.000Z"}
+        for i in range(start, start + rows)
+    ]
+
+@pytest.fixture(autouse=True)
+def small_row_groups(monkeypatch):
+    monkeypatch.setattr(settings, "export_chunk_rows", 10)
+    monkeypatch.setattr(settings, "export_row_group_rows", 40)
+
+async def collect(export_format: str, chunk_count: int, consumed: list):
+    async def chunks():
+        for n in range(chunk_count):
+            consumed.append(n)
+            yield TranscriptChunk(TranscriptBatch.from_raw(raw_page(n * 10, 10)), None)
+
+    parts = []
+    async for part in stream_columnar(chunks(), export_format):
+        parts.append((len(consumed), part))
+    return parts
+
+@pytest.mark.asyncio
+async def test_parquet_streams_before_the_first_full_row_group():
+    consumed = []
+    parts = await collect("parquet", 12, consumed)
+    # Magic bytes before any chunk, then data after the first chunk
+    assert parts[0] == (0, b"PAR1")
+    assert parts[1][0] == 1 and parts[1][1]
+
+    parquet = pq.ParquetFile(io.BytesIO(b"".join(part for _, part in parts)))
+    table = parquet.read()
+    assert table.column("id").to_pylist() == [f"t{i}" for i in range(120)]
+    # Row groups double from one chunk up to export_row_group_rows
+    sizes = [parquet.metadata.row_group(i).num_rows for i in range(parquet.metadata.num_row_groups)]
+    assert sizes == [10, 20, 40, 40, 10]
+
+@pytest.mark.asyncio
+async def test_arrow_streams_after_the_first_chunk():
+    consumed = []
+    parts = await collect("arrow", 5, consumed)
+    assert parts[0][0] == 1 and parts[0][1]
+    table = pa.ipc.open_stream(b"".join(part for _, part in parts)).read_all()
+    assert table.num_rows == 50
+
+@pytest.mark.asyncio
+async def test_byte_cap_flushes_regardless_of_rows(monkeypatch):
+    monkeypatch.setattr(settings, "export_row_group_rows", 10_000)
+    monkeypatch.setattr(settings, "export_chunk_rows", 10_000)
+    monkeypatch.setattr(settings, "export_row_group_bytes", 1)
+    consumed = []
+    parts = await collect("parquet", 3, consumed)
+    assert [count for count, part in parts if part][:4] == [0, 1, 2, 3]
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from app.services import transcript_messages as module
+from app.services.cache import CacheService, MISSING
+from app.services.immutable_cache import ImmutableCache
+from app.services.transcript_messages import TranscriptMessageService
+from app.services.voiceflow_client import voiceflow_client
+
+def transcript(ended: bool, texts=("hi",)):
+    return {"transcript": {
+        "endedAt": "2025-10-01T00:05:00.000Z" if ended else None,
+        "logs": [
+            {"type": "trace", "createdAt": "2025-10-01T00:00:00.000Z", "data": {"type": "text", "payload": {"message": text}}}
+            for text in texts
+        ],
+    }}
+
+@pytest.fixture
+def tiers(monkeypatch):
+    cache, immutable = CacheService(), ImmutableCache()
+    immutable.disk_dir = None
+    monkeypatch.setattr(module, "cache_service", cache)
+    monkeypatch.setattr(module, "immutable_cache", immutable)
+    return cache, immutable
+
+@pytest.fixture
+def upstream(monkeypatch):
+    state = {"transcripts": {}, "calls": 0}
+
+    async def get_transcript_with_logs(transcript_id):
+        state["calls"] += 1
+        await asyncio.sleep(0.01)
+        return state["transcripts"][transcript_id]
+
+    monkeypatch.setattr(voiceflow_client, "get_transcript_with_logs", get_transcript_with_logs)
+    return state
+
+@pytest.mark.asyncio
+async def test_finished_transcripts_skip_the_live_tier(tiers, upstream):
+    cache, immutable = tiers
+    upstream["transcripts"]["t1"] = transcript(ended=True)
+    service = TranscriptMessageService()
+    results = await asyncio.gather(*[service.get("t1") for _ in range(3)])
+    assert results[0] and results == [results[0]] * 3
+    assert upstream["calls"] == 1
+    assert await immutable.get(service._final_key("t1")) == results[0]
+    assert await cache.get(service._live_key("t1")) is MISSING
+
+    assert await service.get("t1") == results[0]
+    assert upstream["calls"] == 1
+
+@pytest.mark.asyncio
+async def test_in_progress_transcripts_use_the_live_tier(tiers, upstream):
+    cache, immutable = tiers
+    upstream["transcripts"]["t2"] = transcript(ended=False)
+    service = TranscriptMessageService()
+    messages = await service.get("t2")
+    assert await cache.get(service._live_key("t2")) == messages
+    assert await immutable.get(service._final_key("t2")) is MISSING
+
+    # Served from the live tier while fresh
+    assert await service.get("t2") == messages
+    assert upstream["calls"] == 1
@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+import pytest
+import pytest_asyncio
+from app.core.config import settings
+from conftest import assert_same_overview, day_iso, days_ago, utc_today
+
+BACKFILL_DAYS = 70
+
+@pytest_asyncio.fixture
+async def synced(monkeypatch, fake_voiceflow, warehouse_store, sync_worker):
+    monkeypatch.setattr(settings, "warehouse_backfill_days", BACKFILL_DAYS)
+    for n in range(1, BACKFILL_DAYS + 1):
+        fake_voiceflow.add_day(days_ago(n), transcripts=2 + n % 5, seed=n)
+    await sync_worker.sync_project("p")
+    return warehouse_store
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+def ranges():
+    """Day-aligned ranges served by hour, day and month rollup segments"""
+    this_month = month_start(utc_today())
+    last_month = month_start(this_month - timedelta(days=1))
+    return [
+        (days_ago(10), days_ago(3)),
+        (days_ago(2), days_ago(1)),
+        (last_month, this_month),
+        (last_month - timedelta(days=5), this_month + timedelta(days=min(3, utc_today().day - 1))),
+        (days_ago(60), days_ago(1)),
+    ]
+
+@pytest.mark.asyncio
+async def test_rollup_router_matches_the_raw_aggregate(synced):
+    for first, stop in ranges():
+        start, end = day_iso(first), day_iso(stop)
+        routed = synced._rollup_aggregate("p", start, end)
+        assert routed is not None
+        assert_same_overview(routed, synced._overview_aggregate("p", start, end))
+        days = range((utc_today() - stop).days + 1, (utc_today() - first).days + 1)
+        assert routed.transcripts == sum(2 + n % 5 for n in days)
+
+@pytest.mark.asyncio
+async def test_hour_aligned_ranges_count_only_their_hours(synced, fake_voiceflow):
+    start = day_iso(days_ago(5)).replace("T00", "T06")
+    end = day_iso(days_ago(3)).replace("T00", "T18")
+    routed = synced._rollup_aggregate("p", start, end)
+    expected = [t for t in fake_voiceflow.transcripts if start <= t["createdAt"] < end]
+    assert routed.transcripts == synced._overview_aggregate("p", start, end).transcripts == len(expected)
+    assert routed.interactions == sum(
+        item["count"] for item in fake_voiceflow.interactions if start <= item["period"] < end
+    )
+
+@pytest.mark.asyncio
+async def test_rollups_follow_resynced_transcripts(synced, fake_voiceflow, sync_worker):
+    start, end = day_iso(days_ago(3)), day_iso(days_ago(1))
+    before = synced._rollup_aggregate("p", start, end).transcripts
+    fake_voiceflow.add_day(days_ago(2), transcripts=4, seed=99)
+    # Same ids as the day's first transcripts plus new ones: updated in place, the rest added
+    await sync_worker.sync_project("p")
+    after = synced._rollup_aggregate("p", start, end)
+    assert after.transcripts == len({
+        t["id"] for t in fake_voiceflow.transcripts if start <= t["createdAt"] < end
+    })
+    assert after.transcripts >= before
+    assert_same_overview(after, synced._overview_aggregate("p", start, end))
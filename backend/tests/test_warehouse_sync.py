@@ -0,0 +1,57 @@
+import pytest
+from app.core.config import settings
+from conftest import day_iso, days_ago
+
+pytestmark = pytest.mark.asyncio
+
+@pytest.fixture(autouse=True)
+def small_backfill(monkeypatch):
+    monkeypatch.setattr(settings, "warehouse_backfill_days", 10)
+    monkeypatch.setattr(settings, "warehouse_sync_overlap_hours", 24)
+
+async def test_sync_stores_transcripts_and_records_coverage(fake_voiceflow, warehouse_store, sync_worker):
+    for n in range(1, 12):
+        fake_voiceflow.add_day(days_ago(n), transcripts=5, seed=n)
+    await sync_worker.sync_project("p")
+
+    stored = await warehouse_store.get_transcripts("p", day_iso(days_ago(10)), day_iso(days_ago(0)), limit=1000)
+    assert len(stored) == 5 * 10
+    assert warehouse_store.covers("p", day_iso(days_ago(10)), day_iso(days_ago(3)))
+
+async def test_covers_rejects_ranges_outside_synced_history(fake_voiceflow, warehouse_store, sync_worker):
+    fake_voiceflow.add_day(days_ago(1), transcripts=3)
+    await sync_worker.sync_project("p")
+
+    # Before the backfill
+    assert not warehouse_store.covers("p", day_iso(days_ago(30)), day_iso(days_ago(3)))
+    # Inside the overlap window that the next sync still revises
+    assert not warehouse_store.covers("p", day_iso(days_ago(3)), day_iso(days_ago(-1)))
+    # Unknown or no longer configured projects
+    assert not warehouse_store.covers("other", day_iso(days_ago(3)), day_iso(days_ago(2)))
+    settings.warehouse_projects = []
+    assert not warehouse_store.covers("p", day_iso(days_ago(3)), day_iso(days_ago(2)))
+
+async def test_stalled_sync_stops_covering_recent_ranges(fake_voiceflow, warehouse_store, sync_worker):
+    await sync_worker.sync_project("p")
+    assert warehouse_store.covers("p", day_iso(days_ago(5)), day_iso(days_ago(2)))
+    # Last successful sync ran days ago: its range end is the limit, not "now"
+    await warehouse_store.set_watermark("p", day_iso(days_ago(4)), day_iso(days_ago(10)), day_iso(days_ago(4)))
+    assert not warehouse_store.covers("p", day_iso(days_ago(5)), day_iso(days_ago(2)))
+    assert warehouse_store.covers("p", day_iso(days_ago(8)), day_iso(days_ago(5)))
+
+async def test_watermark_advances_without_new_transcripts(fake_voiceflow, warehouse_store, sync_worker):
+    await sync_worker.sync_project("p")
+    first = await warehouse_store.get_watermark("p")
+    assert first > day_iso(days_ago(0))
+
+    fake_voiceflow.calls.clear()
+    await sync_worker.sync_project("p")
+    # Only the overlap window is pulled again, not the whole backfill
+    assert fake_voiceflow.calls.count("top_intents") <= 3
+
+async def test_synced_from_is_kept_across_syncs(fake_voiceflow, warehouse_store, sync_worker):
+    await sync_worker.sync_project("p")
+    (synced_from,), = warehouse_store.db.query("SELECT synced_from FROM sync_state WHERE project_id = 'p'")
+    await sync_worker.sync_project("p")
+    assert warehouse_store.db.query("SELECT synced_from FROM sync_state WHERE project_id = 'p'") == [(synced_from,)]
+    assert synced_from == day_iso(days_ago(10))